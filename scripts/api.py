@@ -1,11 +1,12 @@
-from fastapi import FastAPI, Body
+from fastapi import FastAPI, Body, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from pathlib import Path
+from contextlib import asynccontextmanager
 import os, time, json, uuid
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
 load_dotenv()
 SUPABASE_URL = os.environ["SUPABASE_URL"]
@@ -15,9 +16,30 @@ BUCKET        = os.environ.get("W2C_BUCKET", "w2c")
 INCOMING      = os.environ.get("W2C_INCOMING_PREFIX", "incoming/")
 OUTPUTS       = os.environ.get("W2C_OUTPUTS_PREFIX",  "outputs/")
 
-sb: Client = create_client(SUPABASE_URL, SERVICE_KEY)  # service key so we can sign uploads & manage jobs
+# One pooled HTTP/2 client for the Storage REST API (service key so we can sign
+# uploads & manage jobs); every request multiplexes over the same connection.
+_http = httpx.AsyncClient(
+    base_url=f"{SUPABASE_URL}/storage/v1",
+    headers={"Authorization": f"Bearer {SERVICE_KEY}", "apikey": SERVICE_KEY},
+    http2=True,
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+)
 
-app = FastAPI()
+async def _download(path: str) -> bytes:
+    r = await _http.get(f"/object/{BUCKET}/{path}")
+    r.raise_for_status()
+    return r.content
+
+async def _upload(path: str, data: bytes, ctype: str) -> None:
+    r = await _http.post(f"/object/{BUCKET}/{path}", content=data, headers={"Content-Type": ctype, "x-upsert": "true"})
+    r.raise_for_status()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    yield
+    await _http.aclose()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 class SignReq(BaseModel):
@@ -31,20 +53,27 @@ def safe_name(name: str) -> str:
 def job_key(job_id: str) -> str:
     return f"jobs/{job_id}.json"
 
+async def write_job(job: dict) -> None:
+    await _upload(job_key(job["id"]), json.dumps(job).encode("utf-8"), "application/json")
+
 @app.post("/sign-upload")
-def sign_upload(body: SignReq):
+async def sign_upload(body: SignReq, background_tasks: BackgroundTasks):
     """
     Create a signed URL so the browser can PUT the file directly to Supabase Storage.
+    The job record is written after the response goes out.
     """
     fn = safe_name(body.filename)
-    path = f"{INCOMING}{int(time.time())}_{fn}"
+    job_id = str(uuid.uuid4())
+    # job id leads the object name so the worker recovers it without a lookup;
+    # kept flat (not a job_id/ folder) because the worker lists INCOMING non-recursively
+    path = f"{INCOMING}{job_id}_{int(time.time())}_{fn}"
     # Signed upload URL is valid for 60 mins (3600s)
-    res = sb.storage.from_(BUCKET).create_signed_upload_url(path)
-    signed_url = res["signedUrl"]    # e.g. /storage/v1/object/sign/...
-    full_url   = f"{SUPABASE_URL}{signed_url}"
+    r = await _http.post(f"/object/upload/sign/{BUCKET}/{path}")
+    r.raise_for_status()
+    signed_url = r.json()["url"]    # e.g. /object/upload/sign/...?token=...
+    full_url   = f"{SUPABASE_URL}/storage/v1{signed_url}"
 
-    # Create a job record (status=pending)
-    job_id = str(uuid.uuid4())
+    # Create a job record (status=pending) off the request path
     job = {
         "id": job_id,
         "input_path": path,
@@ -52,15 +81,15 @@ def sign_upload(body: SignReq):
         "created_at": int(time.time()),
         "outputs": {}
     }
-    sb.storage.from_(BUCKET).upload(job_key(job_id), json.dumps(job).encode("utf-8"), {"content-type": "application/json", "x-upsert": "true"})
+    background_tasks.add_task(write_job, job)
 
     return JSONResponse({"ok": True, "job_id": job_id, "upload_url": full_url, "storage_path": path})
 
 @app.get("/status")
-def status(job_id: str):
+async def status(job_id: str):
     """Return the current job JSON."""
     try:
-        data = sb.storage.from_(BUCKET).download(job_key(job_id))
+        data = await _download(job_key(job_id))
         job = json.loads(data.decode("utf-8"))
         return job
     except Exception as e:
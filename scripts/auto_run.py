@@ -1,39 +1,78 @@
-import time, subprocess, sys, os, re
+import os, subprocess, sys, time
 from pathlib import Path
+from watchfiles import watch, Change
 
 INPUTS = Path("inputs")
 INPUTS.mkdir(exist_ok=True)
-SEEN = {}
 
-AUDIO = re.compile(r".+\.(mp3|m4a|wav|flac|aac|ogg)$", re.I)
+AUDIO_EXTS = frozenset({"mp3", "m4a", "wav", "flac", "aac", "ogg"})
+QUIET = 2.0  # seconds a file's size and mtime must hold still before it's processed
+DONE = {}    # path -> mtime it was last processed at
+
+def is_audio(name):
+  return name.rpartition(".")[2].lower() in AUDIO_EXTS
 
 def run(cmd):
   print("▶", " ".join(cmd))
   subprocess.run(cmd, check=True)
 
 def process(path):
-  # 1) Notes
-  run(["scripts/run_one.sh", str(path), "Odin :: Foundations", "small"])
+  # 1) Notes (run_one.sh lets w2c asr pick medium on a GPU, small otherwise)
+  run(["scripts/run_one.sh", str(path), "Odin :: Foundations"])
   # 2) Deck (pick your default: ds or git)
   run(["poetry", "run", "python", "scripts/make_decks.py", "--mode", "ds"])
   # 3) (Optional) publish to website — enable if you want:
   # run(["scripts/publish.sh"])
 
-print("Watching", INPUTS.resolve(), "for new/updated audio… (Ctrl+C to stop)")
-while True:
+def settled(path):
+  """Wait until a copy into inputs/ has finished; its final stat, or None if it went away."""
+  try:
+    st = path.stat()
+    while True:
+      time.sleep(QUIET)
+      now = path.stat()
+      if (now.st_size, now.st_mtime_ns) == (st.st_size, st.st_mtime_ns):
+        return now
+      st = now
+  except FileNotFoundError:
+    return None
+
+def handle(path):
+  # events that arrive while settled() waits show up in the next batch; the
+  # mtime check keeps them from processing the same file twice
+  st = settled(path)
+  if st is None or DONE.get(path) == st.st_mtime:
+    return
+  DONE[path] = st.st_mtime
   try:
-    for p in INPUTS.iterdir():
-      if not AUDIO.match(p.name): 
-        continue
-      mtime = p.stat().st_mtime
-      if SEEN.get(p) != mtime:
-        # debounce: wait a bit to ensure copy finished
-        SEEN[p] = mtime
-        time.sleep(1.0)
-        process(p)
-    time.sleep(1.0)
-  except KeyboardInterrupt:
-    sys.exit(0)
+    process(path)
   except Exception as e:
     print("WARN:", e)
-    time.sleep(2)
+
+def process_existing():
+  # watch() only reports changes, so audio already sitting in inputs/ gets one
+  # pass first; rescan until nothing new or modified turns up, so files that
+  # land while the backlog runs aren't missed before the watcher starts
+  while True:
+    with os.scandir(INPUTS) as it:
+      entries = sorted((Path(e.path), e.stat().st_mtime) for e in it if is_audio(e.name) and e.is_file())
+    todo = [p for p, mtime in entries if DONE.get(p) != mtime]
+    if not todo:
+      return
+    for p in todo:
+      handle(p)
+
+def audio_filter(change, path):
+  return change != Change.deleted and is_audio(Path(path).name)
+
+print("Watching", INPUTS.resolve(), "for new/updated audio… (Ctrl+C to stop)")
+# kernel file events (inotify/FSEvents) instead of a 1s poll. watch() batches
+# events for at most `debounce` ms, which is no guarantee a copy has finished,
+# so handle() also waits for the file to stop changing before processing it
+try:
+  process_existing()
+  for changes in watch(INPUTS, watch_filter=audio_filter, debounce=1500, step=1000):
+    for path in sorted({p for _, p in changes}):
+      handle(Path(path))
+except KeyboardInterrupt:
+  sys.exit(0)
@@ -2,8 +2,9 @@
 set -euo pipefail
 FILE="${1:?Usage: scripts/run_one.sh path/to/audio.mp3}"
 DECK="${2:-General :: Latest Run}"
-MODEL="${3:-small}"
-echo "▶ ASR ($MODEL)"; poetry run w2c asr "$FILE" -o outputs -m "$MODEL"
+DEVICE="${W2C_DEVICE:-auto}"   # W2C_DEVICE=cpu keeps everything on the CPU
+MODEL="${3:-auto}"                 # auto: w2c asr picks medium if CTranslate2 sees a GPU, else small
+echo "▶ ASR ($MODEL)"; poetry run w2c asr "$FILE" -o outputs -m "$MODEL" --device "$DEVICE"
 echo "▶ Segment";      poetry run w2c segment   outputs/transcript.json -o outputs --max-chars 1200
 echo "▶ Structure";    poetry run w2c structure outputs/sections.json   -o outputs
 echo "▶ Render";       poetry run w2c render    outputs/structured.json -o outputs --embed-fonts
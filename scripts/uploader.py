@@ -1,18 +1,51 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
-import shutil, time
+import time, uuid
+import aiofiles
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import FileTarget
 
 app = FastAPI()
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 INPUTS = Path("inputs"); INPUTS.mkdir(exist_ok=True)
 
+def safe_name(name: str) -> str:
+    return "".join(c for c in name if c.isalnum() or c in " ._-").strip()
+
 @app.post("/upload")
-async def upload(file: UploadFile = File(...)):
-    safe = "".join(c for c in file.filename if c.isalnum() or c in " ._-").strip()
-    dest = INPUTS / f"{int(time.time())}_{safe}"
-    with dest.open("wb") as f:
-        shutil.copyfileobj(file.file, f)   # <-- actually save the bytes
+async def upload(request: Request):
+    """
+    Stream the request body straight to inputs/ without spooling it through
+    UploadFile. Accepts multipart/form-data with a `file` field, or a raw
+    body with the name in an `X-Filename` header.
+    """
+    stamp = int(time.time())
+    # write under a hidden temp name and rename only once the body is complete,
+    # so auto_run.py never sees a half-uploaded audio file in inputs/
+    tmp = INPUTS / f".{stamp}_{uuid.uuid4().hex}.part"
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            # the name is only known once the part headers arrive
+            target = FileTarget(str(tmp))
+            parser = StreamingFormDataParser(headers=request.headers)
+            parser.register("file", target)
+            async for chunk in request.stream():
+                parser.data_received(chunk)
+            if not tmp.exists():
+                return JSONResponse({"ok": False, "error": "missing 'file' field"}, status_code=400)
+            name = target.multipart_filename or ""
+        else:
+            async with aiofiles.open(tmp, "wb") as f:
+                async for chunk in request.stream():
+                    await f.write(chunk)
+            name = request.headers.get("x-filename", "")
+    except BaseException:
+        # malformed multipart body, client disconnect, ...: no .part left behind
+        tmp.unlink(missing_ok=True)
+        raise
+    dest = INPUTS / f"{stamp}_{safe_name(name)}"
+    tmp.replace(dest)
     return JSONResponse({"ok": True, "path": str(dest.name)})
@@ -1,8 +1,19 @@
 # scripts/worker_supabase.py
-import os, time, json, subprocess
+import os, time, json, uuid, shutil, asyncio, tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+import orjson
 from pathlib import Path
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client
+
+from whisper_to_cards.asr import default_model_size, get_model, transcribe_audio, write_transcript
+from whisper_to_cards.segment import segment_transcript, write_sections
+from whisper_to_cards.structure import structure_sections
+from whisper_to_cards.render import write_html, write_pdf
+from whisper_to_cards.cards import write_deck_csv, build_apkg, GENANKI
+from whisper_to_cards.export.zipper import make_zip
 
 AUDIO_EXTS = {".mp3", ".wav", ".m4a"}
 
@@ -13,112 +24,322 @@ BUCKET       = os.environ.get("W2C_BUCKET","w2c")
 INCOMING     = os.environ.get("W2C_INCOMING_PREFIX","incoming/")
 OUTPUTS      = os.environ.get("W2C_OUTPUTS_PREFIX","outputs/")
 
-sb = create_client(SUPABASE_URL, SERVICE_KEY)
-
-def list_incoming():
-    # flat listing – adjust if you use folders
-    files = sb.storage.from_(BUCKET).list(INCOMING, {"limit": 1000})
-    # normalize to full path "incoming/<name>"
-    out = []
-    for o in files:
-        name = o["name"]
-        if name.endswith("/"):
-            continue
-        out.append(f"{INCOMING}{name}" if not name.startswith(INCOMING) else name)
-    return out
-
-def download(remote_path: str, to: Path):
-    data = sb.storage.from_(BUCKET).download(remote_path)
-    to.write_bytes(data)
-
-def find_job_for(input_path: str):
-    jobs = sb.storage.from_(BUCKET).list("jobs/", {"limit": 1000})
-    for f in jobs:
-        key = f"jobs/{f['name']}"
-        try:
-            blob = sb.storage.from_(BUCKET).download(key)
-            job = json.loads(blob.decode("utf-8"))
-            if job.get("input_path") == input_path:
-                return key, job
-        except Exception:
-            pass
-    return "", {}
-
-def update_job(key: str, **chg):
-    job = json.loads(sb.storage.from_(BUCKET).download(key).decode("utf-8"))
-    job.update(chg)
-    sb.storage.from_(BUCKET).upload(
-        key,
-        json.dumps(job).encode("utf-8"),
-        {"content-type": "application/json", "x-upsert": "true"},
-    )
+STATE_FILE   = Path(".worker_state.json")
+WORK         = Path("work")  # one private outputs tree per job
+PAGE_SIZE    = 100
+CHUNK        = 1 << 16  # 64 KB streaming chunks for artifact transfers
+SEEN_MAX     = 10_000
+POLL_MIN, POLL_MAX = 3.0, 15.0
+IDLE_CYCLES  = 5   # empty polls before backing off to POLL_MAX
+MAX_ATTEMPTS = int(os.environ.get("W2C_MAX_ATTEMPTS", "3"))
+RETRY_BASE   = 30.0  # seconds before the first retry; doubles per failure
+
+# jobs in flight at once; ASR is heavy so the pipeline itself gets its own bound
+CONCURRENCY  = int(os.environ.get("W2C_CONCURRENCY", "4"))
+ASR_CONCURRENCY = int(os.environ.get("W2C_ASR_CONCURRENCY", "1"))
+MODEL        = os.environ.get("W2C_MODEL") or default_model_size()  # device from $W2C_DEVICE
+DECK         = "Odin :: Foundations"
+asr_sem = asyncio.Semaphore(ASR_CONCURRENCY)
+io_sem  = asyncio.Semaphore(8)
+
+# One pooled HTTP/2 client for the Storage REST API (the supabase-py client is
+# sync); all coroutines multiplex over the same TLS connection.
+http = httpx.AsyncClient(
+    base_url=f"{SUPABASE_URL}/storage/v1",
+    headers={"Authorization": f"Bearer {SERVICE_KEY}", "apikey": SERVICE_KEY},
+    http2=True,
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+    timeout=60,
+)
 
-def signed_url(path: str, secs=3600*24*30):
-    return sb.storage.from_(BUCKET).create_signed_url(path, secs)["signedURL"]
+async def _download(path: str) -> bytes:
+    r = await http.get(f"/object/{BUCKET}/{path}")
+    r.raise_for_status()
+    return r.content
 
-def upload(local: Path, remote: str, ctype: str):
-    sb.storage.from_(BUCKET).upload(
-        remote, local.read_bytes(),
-        {"content-type": ctype, "x-upsert": "true"}
+async def _upload(path: str, data: bytes, ctype: str):
+    r = await http.post(
+        f"/object/{BUCKET}/{path}", content=data,
+        headers={"Content-Type": ctype, "x-upsert": "true"},
     )
-    return signed_url(remote)
+    r.raise_for_status()
 
-def process_one(remote_in: str):
-    name = Path(remote_in).name
-    # skip non-audio (prevents .emptyFolderPlaceholder crash)
-    if Path(name).suffix.lower() not in AUDIO_EXTS:
-        print(f"↷ Skipping non-audio {name}")
-        return
+async def _put_file(path: str, local: Path, ctype: str):
+    async def chunks():
+        with local.open("rb") as f:
+            while chunk := f.read(CHUNK):
+                yield chunk
+    # explicit Content-Length keeps httpx from switching to chunked encoding
+    r = await http.post(
+        f"/object/{BUCKET}/{path}", content=chunks(),
+        headers={"Content-Type": ctype, "x-upsert": "true",
+                 "Content-Length": str(local.stat().st_size)},
+    )
+    r.raise_for_status()
+
+async def _get_file(path: str, to: Path):
+    async with http.stream("GET", f"/object/{BUCKET}/{path}") as r:
+        r.raise_for_status()
+        with to.open("wb") as f:
+            async for chunk in r.aiter_bytes(CHUNK):
+                f.write(chunk)
+
+async def _list(prefix: str, limit: int = PAGE_SIZE, offset: int = 0, sort_by: dict | None = None) -> list:
+    body = {"prefix": prefix, "limit": limit, "offset": offset}
+    if sort_by:
+        body["sortBy"] = sort_by
+    r = await http.post(f"/object/list/{BUCKET}", json=body)
+    r.raise_for_status()
+    return r.json()
+
+def load_cursor() -> str:
+    try:
+        state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+        return state.get("last_seen_updated_at") or state.get("last_seen_created_at", "")
+    except Exception:
+        return ""
+
+def save_cursor(updated_at: str):
+    STATE_FILE.write_text(json.dumps({"last_seen_updated_at": updated_at}), encoding="utf-8")
+
+async def list_incoming(since: str = ""):
+    """
+    Yield (path, updated_at) for audio objects under INCOMING, oldest first.
+    Pages newest-first and stops once a page reaches objects older than
+    `since`, so a quiet bucket costs one small LIST per poll. Sorting on
+    updated_at (not created_at) lets re-uploads to the same path resurface.
+    """
+    fresh = []
+    offset = 0
+    while True:
+        page = await _list(INCOMING, PAGE_SIZE, offset, {"column": "updated_at", "order": "desc"})
+        done = len(page) < PAGE_SIZE
+        for o in page:
+            name = o["name"]
+            if o.get("id") is None:  # folder entries
+                continue
+            updated = o.get("updated_at") or o.get("created_at") or ""
+            if since and updated < since:
+                done = True
+                break
+            # placeholders etc. never cost a download
+            if Path(name).suffix.lower() not in AUDIO_EXTS:
+                continue
+            # normalize to full path "incoming/<name>"
+            fresh.append((f"{INCOMING}{name}" if not name.startswith(INCOMING) else name, updated))
+        if done:
+            break
+        offset += PAGE_SIZE
+    for item in reversed(fresh):
+        yield item
+
+async def download(remote_path: str, to: Path):
+    await _get_file(remote_path, to)
+
+def job_key_for(remote_in: str) -> str:
+    """api.py::sign_upload names uploads <job_id>_<ts>_<file>, so no lookup is needed."""
+    job_id = Path(remote_in).name.split("_", 1)[0]
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        return ""  # dropped into the bucket by hand; no job record
+    return f"jobs/{job_id}.json"
+
+async def update_job(key: str, current: dict | None = None, **chg) -> dict:
+    """Merge `chg` into the job record; pass the last known `current` to skip the re-download."""
+    if current is None:
+        current = orjson.loads(await _download(key))
+    job = {**current, **chg}
+    await _upload(key, orjson.dumps(job), "application/json")
+    return job
+
+async def signed_url(path: str, secs=3600*24*30):
+    r = await http.post(f"/object/sign/{BUCKET}/{path}", json={"expiresIn": secs})
+    r.raise_for_status()
+    return f"{SUPABASE_URL}/storage/v1{r.json()['signedURL']}"
+
+async def upload(local: Path, remote: str, ctype: str):
+    await _put_file(remote, local, ctype)
+    return await signed_url(remote)
 
+# ---------- pipeline process ----------
+# Long-lived child process(es) that keep whisper_to_cards imported and the
+# Whisper model loaded between jobs; every stage is a plain function call.
+
+def _warm_pipeline(model: str):
+    get_model(model)
+
+def run_pipeline(audio: str, stage: str, model: str = MODEL, deck: str = DECK):
+    """ASR → segment → structure → render → cards → bundle, all in-process, into `stage`."""
+    out = Path(stage) / "outputs"; out.mkdir(parents=True, exist_ok=True)
+    transcript = out / "transcript.json"
+    write_transcript(transcribe_audio(Path(audio), model_size=model), transcript)
+    secs = segment_transcript(transcript_path=transcript, max_chars=1200)
+    write_sections(secs, out / "sections.json",
+                   meta={"source": str(transcript), "max_chars": 1200, "version": 1})
+    payload = structure_sections(out / "sections.json")
+    (out / "structured.json").write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+    write_html(payload, out / "notes.html", embed_fonts=True)
+    try:
+        write_pdf(payload, out / "notes.pdf", embed_fonts=True)
+    except Exception as e:
+        print("PDF skipped:", e)
+    write_deck_csv(payload, out / "deck.csv")
+    if GENANKI:
+        build_apkg(payload, out / "deck.apkg", deck_name=deck)
+    make_zip(out, Path(stage) / "dist/lecture_easyread.zip")
+
+pipeline: ProcessPoolExecutor | None = None
+
+async def process_one(remote_in: str):
+    name = Path(remote_in).name
     inputs = Path("inputs"); inputs.mkdir(exist_ok=True)
     local_in = inputs / name
     print("↓", remote_in)
-    download(remote_in, local_in)
-
-    job_key, _ = find_job_for(remote_in)
-    if job_key:
-        update_job(job_key, status="running", started_at=int(time.time()))
-
-    # full W2C pipeline
-    subprocess.run(["scripts/run_one.sh", str(local_in), "Odin :: Foundations", "small"], check=True)
-    subprocess.run(["poetry","run","python","scripts/make_decks.py","--mode","ds"], check=True)
+    async with io_sem:
+        await download(remote_in, local_in)
+        job_key = job_key_for(remote_in)
+        if job_key:
+            try:
+                job = await update_job(job_key, status="running", started_at=int(time.time()))
+            except httpx.HTTPStatusError:
+                job_key = ""
 
     # upload artifacts (use one canonical ZIP name)
     slug = Path(name).stem.replace(" ", "_")
     outdir = f"{OUTPUTS}{slug}/"
-    links = {}
+    # a private tree per job, so concurrent pipelines (W2C_ASR_CONCURRENCY > 1)
+    # never overwrite each other's outputs; paths below are relative to it
+    WORK.mkdir(exist_ok=True)
+    stage = Path(tempfile.mkdtemp(prefix=f"{slug}-", dir=WORK))
+    artifacts = [
+        ("notes.html", "outputs/notes.html", "text/html"),
+        ("notes.pdf",  "outputs/notes.pdf",  "application/pdf"),
+        ("deck.csv",   "outputs/deck.csv",   "text/csv"),
+        ("deck.apkg",  "outputs/deck.apkg",  "application/octet-stream"),
+        ("bundle.zip", "dist/lecture_easyread.zip", "application/zip"),  # keep underscore; see #4
+    ]
 
-    def up(rel, loc, ctype):
-        p = Path(loc)
-        if p.exists():
-            links[rel] = upload(p, f"{outdir}{rel}", ctype)
+    try:
+        # full W2C pipeline
+        async with asr_sem:
+            await asyncio.get_running_loop().run_in_executor(
+                pipeline, run_pipeline, str(local_in), str(stage)
+            )
 
-    up("notes.html", "outputs/notes.html", "text/html")
-    up("notes.pdf",  "outputs/notes.pdf",  "application/pdf")
-    up("deck.csv",   "outputs/deck.csv",   "text/csv")
-    up("deck.apkg",  "outputs/deck.apkg",  "application/octet-stream")
-    up("bundle.zip", "dist/lecture_easyread.zip", "application/zip")  # keep underscore; see #4
+        async def up(rel: str, loc: str, ctype: str):
+            async with io_sem:
+                return rel, await upload(stage / loc, f"{outdir}{rel}", ctype)
 
+        # independent PUT + sign per artifact: wall-clock ≈ slowest, not the sum
+        links = dict(await asyncio.gather(
+            *(up(rel, loc, ctype) for rel, loc, ctype in artifacts if (stage / loc).exists())
+        ))
+    except Exception as e:
+        # the main loop retries it; meanwhile don't leave the job "running"
+        if job_key:
+            try:
+                async with io_sem:
+                    await update_job(job_key, job, status="error", error=str(e))
+            except httpx.HTTPError:
+                pass
+        raise
+    finally:
+        shutil.rmtree(stage, ignore_errors=True)
     if job_key:
-        update_job(job_key, status="complete", completed_at=int(time.time()), outputs=links)
+        async with io_sem:
+            await update_job(job_key, job, status="complete", completed_at=int(time.time()), outputs=links)
     print("✓", name)
 
-def main():
-    seen = set()
-    print("Worker: polling Supabase… (Ctrl+C to stop)")
-    while True:
+async def main_async():
+    global pipeline
+    pipeline = ProcessPoolExecutor(
+        max_workers=ASR_CONCURRENCY,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_warm_pipeline, initargs=(MODEL,),
+    )
+    # bounded LRU of processed (path, updated_at): unchanged files are skipped,
+    # re-uploads to the same path get processed again
+    seen: OrderedDict[tuple[str, str], None] = OrderedDict()
+    inflight: dict[str, str] = {}                 # path -> updated_at
+    # path -> (updated_at, attempts, monotonic time of the next retry)
+    failed: dict[str, tuple[str, int, float]] = {}
+    slots = asyncio.Semaphore(CONCURRENCY)
+    state = {"cursor": load_cursor(), "done": ""}
+
+    def settle(path: str, updated: str):
+        seen[(path, updated)] = None
+        if len(seen) > SEEN_MAX:
+            seen.popitem(last=False)
+        state["done"] = max(state["done"], updated)
+        failed.pop(path, None)
+
+    async def handle(path: str, updated: str):
         try:
-            for path in list_incoming():
-                if path in seen:
-                    continue
-                process_one(path)
-                seen.add(path)
-        except KeyboardInterrupt:
-            break
+            await process_one(path)
+            settle(path, updated)
         except Exception as e:
-            print("WARN:", e)
-            time.sleep(2)
-        time.sleep(3)
+            prev = failed.get(path)
+            attempts = prev[1] + 1 if prev and prev[0] == updated else 1  # re-upload: start over
+            if attempts >= MAX_ATTEMPTS:
+                # give up: the job record keeps status="error", and the path is
+                # only picked up again if it is re-uploaded
+                print(f"WARN: {path} failed {attempts}x, giving up:", e)
+                settle(path, updated)
+            else:
+                print(f"WARN: {path} (attempt {attempts}/{MAX_ATTEMPTS}):", e)
+                failed[path] = (updated, attempts, time.monotonic() + RETRY_BASE * 2 ** (attempts - 1))
+        finally:
+            inflight.pop(path, None)
+            slots.release()
+        # never move the cursor past a job that is still running or waiting for
+        # a retry: list_incoming stops at the cursor, so it must stay above it
+        pending = [*inflight.values(), *(u for u, _, _ in failed.values())]
+        cursor = min(pending) if pending else state["done"]
+        if cursor > state["cursor"]:
+            state["cursor"] = cursor
+            save_cursor(cursor)
+
+    idle = 0
+    tasks: set[asyncio.Task] = set()
+    print("Worker: polling Supabase… (Ctrl+C to stop)")
+    try:
+        while True:
+            t0 = time.monotonic()
+            try:
+                found = False
+                async for path, updated in list_incoming(state["cursor"]):
+                    if path in inflight:
+                        continue
+                    if (path, updated) in seen:
+                        seen.move_to_end((path, updated))
+                        continue
+                    f = failed.get(path)
+                    if f and f[0] == updated and time.monotonic() < f[2]:
+                        continue  # backing off; doesn't count as work for the idle check
+                    found = True
+                    await slots.acquire()
+                    inflight[path] = updated
+                    task = asyncio.create_task(handle(path, updated))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                idle = 0 if found else idle + 1
+            except Exception as e:
+                print("WARN:", e)
+                await asyncio.sleep(2)
+            interval = POLL_MAX if idle >= IDLE_CYCLES else POLL_MIN
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - t0)))
+    finally:
+        for t in tasks:
+            t.cancel()
+        await http.aclose()
+        pipeline.shutdown(cancel_futures=True)
+
+def main():
+    try:
+        asyncio.run(main_async())
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     main()
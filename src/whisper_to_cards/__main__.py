@@ -1,4 +1,89 @@
-from .cli import app
+"""`w2c` entry point: argparse fast path for --version/segment/bundle, Typer for the rest.
+
+Anything the fast path can't handle (--help, bad flags, missing paths) is
+handed to the Typer app so its help and error messages stay the same.
+"""
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+
+FAST_COMMANDS = {"--version", "version", "segment", "bundle"}
+
+
+class _Fallback(Exception):
+    pass
+
+
+class _Parser(argparse.ArgumentParser):
+    def error(self, message):
+        raise _Fallback(message)
+
+
+def _segment(argv: list[str]) -> None:
+    p = _Parser(prog="w2c segment", add_help=False, allow_abbrev=False)
+    p.add_argument("transcript", type=Path)
+    p.add_argument("--outdir", "-o", type=Path, default=Path("outputs"))
+    p.add_argument("--max-chars", type=int, default=1200)
+    a = p.parse_args(argv)
+    if not a.transcript.is_file():
+        raise _Fallback("transcript not found")
+
+    from .segment import segment_transcript, write_sections
+
+    secs = segment_transcript(transcript_path=a.transcript, max_chars=a.max_chars)
+    meta = {"source": str(a.transcript), "max_chars": a.max_chars, "version": 1}
+    out_path = a.outdir / "sections.json"
+    write_sections(secs, out_path, meta=meta)
+    print(f"✅ Wrote {out_path} with {len(secs)} sections")
+
+
+def _bundle(argv: list[str]) -> None:
+    p = _Parser(prog="w2c bundle", add_help=False, allow_abbrev=False)
+    p.add_argument("outdir", type=Path, nargs="?", default=Path("outputs"))
+    p.add_argument("--out", "-o", dest="zip_path", type=Path, default=Path("dist/w2c_bundle.zip"))
+    p.add_argument("--pdf", dest="include_pdf", action="store_true", default=True)
+    p.add_argument("--no-pdf", dest="include_pdf", action="store_false")
+    p.add_argument("--format", dest="fmt", choices=("zip", "zst"), default="zip")
+    a = p.parse_args(argv)
+    if not a.outdir.is_dir():
+        raise _Fallback("outdir not found")
+
+    from .export.zipper import make_zip
+
+    a.zip_path.parent.mkdir(parents=True, exist_ok=True)
+    zp = make_zip(a.outdir, a.zip_path, include_pdf=a.include_pdf, fmt=a.fmt)
+    print(f"📦 Wrote {zp}")
+
+
+def _fast(argv: list[str]) -> bool:
+    """Run argv without Typer if possible; False means "let the Typer app do it"."""
+    if not argv or argv[0] not in FAST_COMMANDS or "--help" in argv or "-h" in argv:
+        return False
+    cmd, rest = argv[0], argv[1:]
+    try:
+        if cmd in ("--version", "version"):
+            if rest:
+                return False
+            from . import __version__
+
+            print(f"whisper-to-cards {__version__}")
+        elif cmd == "segment":
+            _segment(rest)
+        else:
+            _bundle(rest)
+    except _Fallback:
+        return False
+    return True
+
+
+def main() -> None:
+    if _fast(sys.argv[1:]):
+        return
+    from .cli import app
 
-if __name__ == "__main__":
     app()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
 from __future__ import annotations
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
 from typing import List, Optional
-import json
+from functools import lru_cache
+import os
 
+import ctranslate2
+import orjson
 from faster_whisper import WhisperModel
 
 
-@dataclass
+@dataclass(slots=True)
 class Segment:
     start: float
     end: float
@@ -24,23 +27,106 @@ class Transcript:
     def to_dict(self) -> dict:
         return {
             "meta": self.meta,
-            "segments": [asdict(s) for s in self.segments],
+            # plain dict literals: asdict() deep-copies with isinstance checks per field
+            "segments": [
+                {"start": s.start, "end": s.end, "text": s.text, "speaker": s.speaker}
+                for s in self.segments
+            ],
         }
 
 
+def resolve_device(device: str = "auto") -> str:
+    """Resolve "auto": $W2C_DEVICE if set, else CUDA when a GPU is visible, else CPU."""
+    if device == "auto":
+        device = os.environ.get("W2C_DEVICE", "auto")
+    if device != "auto":
+        return device
+    return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+
+def _resolve_compute_type(device: str, compute_type: str) -> str:
+    """
+    Default precision per device: float16 on Ampere+ (CTranslate2 only offers
+    bfloat16 from compute capability 8.0), int8_float16 on older GPUs, int8 on CPU.
+    """
+    if compute_type != "auto":
+        return compute_type
+    if resolve_device(device) != "cuda":
+        return "int8"
+    if "bfloat16" in ctranslate2.get_supported_compute_types("cuda"):
+        return "float16"
+    return "int8_float16"
+
+
+def get_model(
+    model_size: str = "small",
+    device: str = "auto",
+    compute_type: str = "auto",
+    cpu_threads: int = 0,
+    num_workers: int = 2,
+) -> WhisperModel:
+    """Load a WhisperModel once per configuration and reuse it."""
+    # lru_cache keys on the arguments as passed, so get_model("small") and
+    # get_model("small", "auto", "auto", 0, 2) would each load a model; always
+    # hand the cache the full positional tuple
+    return _load_model(model_size, device, compute_type, cpu_threads, num_workers)
+
+
+@lru_cache(maxsize=4)
+def _load_model(
+    model_size: str, device: str, compute_type: str, cpu_threads: int, num_workers: int
+) -> WhisperModel:
+    device = resolve_device(device)
+    kwargs = {}
+    if device == "cuda":
+        # one replica per GPU so concurrent transcribe() calls spread across them
+        n = ctranslate2.get_cuda_device_count()
+        kwargs["device_index"] = list(range(n))
+        num_workers = max(num_workers, n)
+    return WhisperModel(
+        model_size,
+        device=device,
+        compute_type=_resolve_compute_type(device, compute_type),
+        cpu_threads=cpu_threads or (os.cpu_count() or 0),
+        num_workers=num_workers,
+        **kwargs,
+    )
+
+
+def default_model_size(device: str = "auto") -> str:
+    """medium fits comfortably in 8 GB of VRAM; stay on small for CPU."""
+    return "medium" if resolve_device(device) == "cuda" else "small"
+
+
 def transcribe_audio(
     input_path: Path,
     model_size: str = "small",
     language: Optional[str] = None,
     device: str = "auto",  # "cpu" | "cuda" | "auto"
     compute_type: str = "auto",  # "int8" | "float16" | "auto" | ...
+    cpu_threads: int = 0,  # 0 = all cores
+    num_workers: int = 2,
+    beam_size: int = 1,
+    best_of: int = 1,
+    temperature: float = 0.0,
+    condition_on_previous_text: bool = False,
+    word_timestamps: bool = False,  # extra alignment pass; tightens segment bounds
 ) -> Transcript:
-    model = WhisperModel(model_size, device=device, compute_type=compute_type)
+    model = get_model(model_size, device, compute_type, cpu_threads, num_workers)
     segments_iter, _info = model.transcribe(
         str(input_path),
         language=language,
+        beam_size=beam_size,
+        best_of=best_of,
+        temperature=temperature,
+        condition_on_previous_text=condition_on_previous_text,
+        word_timestamps=word_timestamps,
+        chunk_length=30,
         vad_filter=True,
-        vad_parameters=dict(min_silence_duration_ms=300),
+        # coalesce speech into full 30s windows → fewer, fuller decoder calls
+        vad_parameters=dict(
+            min_silence_duration_ms=500, speech_pad_ms=200, max_speech_duration_s=30
+        ),
     )
     segments = [
         Segment(start=float(s.start), end=float(s.end), text=s.text.strip())
@@ -51,8 +137,9 @@ def transcribe_audio(
         "datetime": datetime.now().isoformat(timespec="seconds"),
         "model": model_size,
         "language": language or "auto",
-        "device": device,
-        "compute_type": compute_type,
+        "device": resolve_device(device),
+        "compute_type": _resolve_compute_type(device, compute_type),
+        "beam_size": beam_size,
         "version": 1,
     }
     return Transcript(meta=meta, segments=segments)
@@ -60,7 +147,9 @@ def transcribe_audio(
 
 def write_transcript(transcript: Transcript, out_path: Path) -> Path:
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(
-        json.dumps(transcript.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8"
+    out_path.write_bytes(
+        orjson.dumps(
+            transcript.to_dict(), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        )
     )
     return out_path
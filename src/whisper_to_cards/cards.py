@@ -1,8 +1,11 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, Iterator, Tuple
 import csv
-import json
+import functools
+import hashlib
+
+import orjson
 
 try:
     import genanki  # optional
@@ -17,41 +20,37 @@ except Exception:
 
 def load_structured(path: Path) -> Dict[str, Any]:
     """Read the structured.json produced earlier in the pipeline."""
-    return json.loads(path.read_text(encoding="utf-8"))
+    return orjson.loads(path.read_bytes())
 
 
 # ---------- Transform ----------
 
 
-def _rows_from_structured(data: Dict[str, Any]) -> Tuple[List[List[str]], List[str]]:
+def _iter_basic_rows(data: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
     """
-    Build rows for a single 'deck.csv' (Basic cards) and a list of Cloze strings.
-    - Basic: TL;DR + each bullet become cards.
-    - Cloze: each cloze string ({{c1::...}}) will be used for APKG cloze notes.
+    Yield (Front, Back) rows for Basic cards: TL;DR + each bullet become cards.
     """
-    basic_rows: List[List[str]] = []
-    cloze_texts: List[str] = []
-
     for sec in data.get("sections", []):
         title = (sec.get("title") or "").strip()
         tldr = (sec.get("tldr") or "").strip()
-        bullets: List[str] = sec.get("bullets", []) or []
-        clozes: List[str] = sec.get("cloze", []) or []
 
         if title and tldr:
-            basic_rows.append([f"{title} — TL;DR", tldr])
+            yield f"{title} — TL;DR", tldr
 
-        for i, b in enumerate(bullets, 1):
+        key_point = f"{title} — Key point "
+        for i, b in enumerate(sec.get("bullets") or (), 1):
             b = (b or "").strip()
             if b:
-                basic_rows.append([f"{title} — Key point {i}", b])
+                yield key_point + str(i), b
+
 
-        for c in clozes:
+def _iter_cloze_texts(data: Dict[str, Any]) -> Iterator[str]:
+    """Yield cloze strings ({{c1::...}}) used for APKG cloze notes."""
+    for sec in data.get("sections", []):
+        for c in sec.get("cloze") or ():
             c = (c or "").strip()
             if c:
-                cloze_texts.append(c)
-
-    return basic_rows, cloze_texts
+                yield c
 
 
 # ---------- CSV ----------
@@ -62,12 +61,11 @@ def write_deck_csv(data: Dict[str, Any], out_csv: Path) -> Path:
     Write a single CSV with Basic cards. Columns: Front, Back.
     (Cloze are used only for APKG — not written here.)
     """
-    rows, _cloze = _rows_from_structured(data)
     out_csv.parent.mkdir(parents=True, exist_ok=True)
     with out_csv.open("w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
         w.writerow(["Front", "Back"])
-        w.writerows(rows)
+        w.writerows(_iter_basic_rows(data))
     return out_csv
 
 
@@ -87,7 +85,8 @@ def build_apkg(
             "genanki is not installed; run `poetry add genanki` to enable APKG export."
         )
 
-    deck_id = abs(hash(deck_name)) % (10**10)
+    # str hash() is salted per process; blake2b keeps the id stable across runs
+    deck_id = int(hashlib.blake2b(deck_name.encode("utf-8"), digest_size=5).hexdigest(), 16) % (10**10)
     deck = genanki.Deck(deck_id, deck_name)
 
     basic_model = genanki.Model(
@@ -113,11 +112,10 @@ def build_apkg(
         model_type=genanki.Model.CLOZE,
     )
 
-    basic_rows, cloze_texts = _rows_from_structured(data)
-    for fr, ba in basic_rows:
-        deck.add_note(genanki.Note(model=basic_model, fields=[fr, ba]))
-    for txt in cloze_texts:
-        deck.add_note(genanki.Note(model=cloze_model, fields=[txt]))
+    make_basic = functools.partial(genanki.Note, model=basic_model)
+    make_cloze = functools.partial(genanki.Note, model=cloze_model)
+    deck.notes.extend(make_basic(fields=[fr, ba]) for fr, ba in _iter_basic_rows(data))
+    deck.notes.extend(make_cloze(fields=[txt]) for txt in _iter_cloze_texts(data))
 
     pkg = genanki.Package(deck)
     out_apkg.parent.mkdir(parents=True, exist_ok=True)
@@ -1,20 +1,13 @@
 from typing import Optional
 from pathlib import Path
-import json
+import orjson
 import typer
 
 from . import __version__
-from .asr import transcribe_audio, write_transcript
-from .segment import segment_transcript, write_sections
-from .structure import structure_sections
-from .render import load_structured as load_structured_notes, write_html, write_pdf
-from .tts import build_section_audio
-from .cards import (
-    load_structured as load_cards_struct,
-    write_deck_csv,
-    build_apkg,
-    GENANKI,
-)
+
+# Pipeline modules are imported inside each command: asr pulls in
+# faster-whisper/ctranslate2 and render pulls in WeasyPrint, which would
+# otherwise be paid on every invocation, even --version.
 
 app = typer.Typer(help="Whisper-to-Cards: lecture → dyslexia-friendly notes + Anki.")
 
@@ -51,6 +44,8 @@ def segment(
     max_chars: int = typer.Option(1200, help="Target characters per section"),
 ):
     """Group raw ASR segments into topic-sized sections → outputs/sections.json."""
+    from .segment import segment_transcript, write_sections  # lazy import
+
     secs = segment_transcript(transcript_path=transcript, max_chars=max_chars)
     meta = {"source": str(transcript), "max_chars": max_chars, "version": 1}
     out_path = outdir / "sections.json"
@@ -67,17 +62,43 @@ def asr(
         Path("outputs"), "--outdir", "-o", help="Output directory"
     ),
     model: str = typer.Option(
-        "small", "--model", "-m", help="faster-whisper model size"
+        "small",
+        "--model",
+        "-m",
+        help='faster-whisper model size ("auto" = medium if a GPU is usable, else small)',
     ),
     language: Optional[str] = typer.Option(
         None, "--language", "-l", help="Force language code (e.g., en)"
     ),
     device: str = typer.Option("auto", "--device", help='"cpu", "cuda", or "auto"'),
     compute_type: str = typer.Option(
-        "auto", "--compute-type", help='precision: "int8", "float16", "auto"...'
+        "auto",
+        "--compute-type",
+        help='precision: "int8", "float16", ... ("auto" = int8 on CPU, float16 on Ampere+ GPUs, int8_float16 on older ones)',
+    ),
+    cpu_threads: int = typer.Option(
+        0, "--cpu-threads", help="CPU threads for decoding (0 = all cores)"
+    ),
+    num_workers: int = typer.Option(2, "--num-workers", help="Parallel decoder workers"),
+    beam_size: int = typer.Option(1, "--beam-size", help="1 = greedy decoding"),
+    best_of: int = typer.Option(1, "--best-of"),
+    temperature: float = typer.Option(0.0, "--temperature"),
+    condition_on_previous_text: bool = typer.Option(
+        False,
+        "--condition-on-previous-text/--no-condition-on-previous-text",
+        help="Feed the previous window's text back in as a prompt",
+    ),
+    word_timestamps: bool = typer.Option(
+        False,
+        "--word-timestamps/--no-word-timestamps",
+        help="Align words for tighter segment timings (slower)",
     ),
 ):
     """Transcribe audio → outputs/transcript.json (timestamps + text)."""
+    from .asr import default_model_size, transcribe_audio, write_transcript  # lazy import
+
+    if model == "auto":
+        model = default_model_size(device)
     typer.echo("🎧 Transcribing...")
     transcript = transcribe_audio(
         input_path=input,
@@ -85,6 +106,13 @@ def asr(
         language=language,
         device=device,
         compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        num_workers=num_workers,
+        beam_size=beam_size,
+        best_of=best_of,
+        temperature=temperature,
+        condition_on_previous_text=condition_on_previous_text,
+        word_timestamps=word_timestamps,
     )
     out_path = outdir / "transcript.json"
     write_transcript(transcript, out_path)
@@ -97,13 +125,19 @@ def structure(
         ..., exists=True, readable=True, help="Path to outputs/sections.json"
     ),
     outdir: Path = typer.Option(Path("outputs"), "--outdir", "-o"),
+    jsonl: bool = typer.Option(
+        False, "--jsonl/--no-jsonl", help="Also stream sections to structured.jsonl"
+    ),
 ):
     """Create structured notes schema → outputs/structured.json."""
-    payload = structure_sections(sections)
-    out_path = outdir / "structured.json"
-    out_path.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8"
+    from .structure import structure_sections  # lazy import
+
+    outdir.mkdir(parents=True, exist_ok=True)
+    payload = structure_sections(
+        sections, jsonl_out=outdir / "structured.jsonl" if jsonl else None
     )
+    out_path = outdir / "structured.json"
+    out_path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
     typer.echo(
         f"✅ Wrote {out_path} (sections={len(payload.get('sections', []))}, "
         f"glossary={len(payload.get('glossary', []))})"
@@ -122,6 +156,13 @@ def cards(
     ),
 ):
     """Export Anki deck(s): deck.csv (basic & cloze) and optionally deck.apkg."""
+    from .cards import (  # lazy import
+        load_structured as load_cards_struct,
+        write_deck_csv,
+        build_apkg,
+        GENANKI,
+    )
+
     data = load_cards_struct(structured)
     outdir.mkdir(parents=True, exist_ok=True)
     csv_path = outdir / "deck.csv"
@@ -153,7 +194,16 @@ def render(
     ),
 ):
     """Render accessible notes → notes.html (+ notes.pdf unless --no-pdf)."""
+    from .render import (  # lazy import
+        has_embedded_fonts,
+        load_structured as load_structured_notes,
+        write_html,
+        write_pdf,
+    )
+
     data = load_structured_notes(structured)
+    if embed_fonts and not has_embedded_fonts():
+        typer.echo("⚠️  No usable packaged fonts; notes.html falls back to web/system fonts.")
     outdir.mkdir(parents=True, exist_ok=True)
 
     # Build audio lookup (optional)
@@ -161,11 +211,16 @@ def render(
     audio_rel = None
     if audio_dir:
         audio_lookup = {}
+        # tts names files {sid}-{hash}.mp3 and records them in audio_map.json;
+        # plain {sid}.mp3 still works for hand-made audio
+        amap_path = audio_dir / "audio_map.json"
+        amap = orjson.loads(amap_path.read_bytes()) if amap_path.exists() else {}
         for s in data.get("sections", []):
             sid = s.get("id", "")
-            cand = audio_dir / f"{sid}.mp3"
-            if cand.exists():
-                audio_lookup[sid] = cand.name
+            for name in (amap.get(sid), f"{sid}.mp3"):
+                if name and (audio_dir / name).exists():
+                    audio_lookup[sid] = name
+                    break
         audio_rel = (
             str(audio_dir.relative_to(outdir))
             if audio_dir.is_absolute()
@@ -202,7 +257,9 @@ def tts(
     voice: str = typer.Option("en-us", "--voice"),
     rate: int = typer.Option(170, "--rate"),
 ):
-    """Generate one MP3 per section (espeak-ng → wav → mp3)."""
+    """Generate one MP3 per section (espeak-ng | ffmpeg → mp3)."""
+    from .tts import build_section_audio  # lazy import
+
     amap = build_section_audio(
         structured, outdir, source=source, voice=voice, rate=rate
     )
@@ -217,7 +274,7 @@ def bundle(
         file_okay=False,
         dir_okay=True,
         readable=True,
-        help="Directory containing notes.html (+ pdf/audio/fonts).",
+        help="Directory containing notes.html (+ pdf/audio).",
     ),
     zip_path: Path = typer.Option(
         Path("dist/w2c_bundle.zip"), "--out", "-o", help="Where to write the zip."
@@ -225,10 +282,17 @@ def bundle(
     include_pdf: bool = typer.Option(
         True, "--pdf/--no-pdf", help="Include notes.pdf if present"
     ),
+    fmt: str = typer.Option(
+        "zip",
+        "--format",
+        help='"zip" (deflate, default) or "zst" (zstandard; .tar.zst unless Python has ZIP_ZSTANDARD)',
+    ),
 ):
-    """Create an offline ZIP with notes.html (+ optional pdf, audio, fonts)."""
+    """Create an offline ZIP with notes.html (+ optional pdf, audio)."""
     from .export.zipper import make_zip  # lazy import
 
     zip_path.parent.mkdir(parents=True, exist_ok=True)
-    zp = make_zip(outdir, zip_path, include_pdf=include_pdf)
+    if fmt not in ("zip", "zst"):
+        raise typer.BadParameter('must be "zip" or "zst"', param_hint="--format")
+    zp = make_zip(outdir, zip_path, include_pdf=include_pdf, fmt=fmt)
     typer.echo(f"📦 Wrote {zp}")
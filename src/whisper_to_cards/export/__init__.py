@@ -0,0 +1,15 @@
+from __future__ import annotations
+from pathlib import Path
+
+from .zipper import make_zip
+
+__all__ = ["make_zip", "make_bundle"]
+
+
+def make_bundle(
+    outputs_dir: Path,
+    bundle_name: str = "w2c_bundle.zip",
+    include_pdf: bool = True,
+) -> Path:
+    """Old export.make_bundle signature; writes outputs_dir/bundle_name via make_zip."""
+    return make_zip(outputs_dir, outputs_dir / bundle_name, include_pdf=include_pdf)
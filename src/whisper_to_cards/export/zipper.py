@@ -1,90 +1,190 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List, Dict
-import json
+from typing import Iterator, List, Dict, Tuple
 import hashlib
+import io
+import os
+import tarfile
 import time
 import zipfile
 
+import orjson
+
+try:
+    import zstandard as zstd  # optional: only for fmt="zst" without stdlib ZIP_ZSTANDARD
+
+    ZSTD = True
+except Exception:
+    ZSTD = False
+
+try:
+    import xxhash  # optional: faster manifest digests
+
+    XXHASH = True
+except Exception:
+    XXHASH = False
+
 REQUIRED = ["notes.html"]  # we’ll include notes.pdf if it exists
 
+# already-compressed payloads: deflating them again only burns CPU
+STORED_SUFFIXES = {".mp3", ".woff2", ".woff", ".pdf", ".opus", ".ogg", ".png", ".jpg"}
+
+
+# The manifest digest is for traceability, not attestation, so use a fast
+# non-cryptographic hash when available.
+if XXHASH:
+    DIGEST_ALGO, _new_digest = "xxh3-128", xxhash.xxh3_128
+else:
+    DIGEST_ALGO, _new_digest = "blake2b-128", partial(hashlib.blake2b, digest_size=16)
 
-def _sha256(p: Path) -> str:
-    h = hashlib.sha256()
+
+def _digest(p: Path) -> str:
+    # file_digest reads into one reused 256 KiB buffer and feeds it to update()
     with p.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+        return hashlib.file_digest(f, _new_digest).hexdigest()
+
+
+def _walk(root: str) -> Iterator[Tuple[Path, int]]:
+    """Yield (path, size) for every file under root; DirEntry caches the stat."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.is_file(follow_symlinks=False):
+                    yield Path(e.path), e.stat().st_size
+
 
+def _sized(p: Path) -> Tuple[Path, int] | None:
+    try:
+        return p, p.stat().st_size
+    except FileNotFoundError:
+        return None
 
-def _gather(outdir: Path, include_pdf: bool = True) -> List[Path]:
-    keep: List[Path] = []
+
+def _gather(outdir: Path, include_pdf: bool = True) -> List[Tuple[Path, int]]:
+    keep: List[Tuple[Path, int]] = []
     # required
     for name in ["notes.html"]:
-        p = outdir / name
-        if not p.exists():
+        hit = _sized(outdir / name)
+        if hit is None:
             raise FileNotFoundError(f"Missing {name} in {outdir}")
-        keep.append(p)
+        keep.append(hit)
 
     # optional
-    if include_pdf:
-        p = outdir / "notes.pdf"
-        if p.exists():
-            keep.append(p)
-
-    for name in ["structured.json", "sections.json", "transcript.json"]:
-        p = outdir / name
-        if p.exists():
-            keep.append(p)
-
-    for dname in ["audio", "fonts"]:
-        d = outdir / dname
-        if d.exists():
-            for p in d.rglob("*"):
-                if p.is_file():
-                    keep.append(p)
+    optional = ["notes.pdf"] if include_pdf else []
+    for name in optional + ["structured.json", "sections.json", "transcript.json"]:
+        hit = _sized(outdir / name)
+        if hit is not None:
+            keep.append(hit)
+
+    d = outdir / "audio"
+    if d.is_dir():
+        keep.extend(_walk(str(d)))
     return keep
 
 
-def _manifest(files: List[Path], outdir: Path) -> Dict:
-    items = []
-    for p in files:
-        rel = str(p.relative_to(outdir).as_posix())
-        items.append(
-            {
-                "path": rel,
-                "size": p.stat().st_size,
-                "sha256": _sha256(p),
-            }
-        )
+def _hash(entry: Tuple[Path, int]) -> str:
+    return _digest(entry[0])
+
+
+def _manifest(files: List[Tuple[Path, int]], outdir: Path) -> Dict:
+    # both xxhash and the builtin _blake2 release the GIL inside update() (and
+    # readinto() does too), so threads overlap disk reads and digests
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 4)) as ex:
+        digests = list(ex.map(_hash, files))
+    items = [
+        {
+            "path": str(p.relative_to(outdir).as_posix()),
+            "size": size,
+            "digest": digest,
+        }
+        for (p, size), digest in zip(files, digests)
+    ]
     return {
         "generated_at": int(time.time()),
         "root": str(outdir),
+        "algo": DIGEST_ALGO,
         "files": items,
-        "version": 1,
+        "version": 2,
     }
 
 
-def make_zip(outdir: Path, zip_path: Path, include_pdf: bool = True) -> Path:
+README = (
+    "# Whisper-to-Cards bundle\n\n"
+    "Open **notes.html** in a browser (works offline).\n\n"
+    "- **notes.pdf** is included if we could generate it.\n"
+    "- **audio/** has per-section audio if you created it.\n"
+)
+README_FONTS = "- Fonts are embedded in notes.html so the page renders offline.\n"
+
+
+def _readme(outdir: Path) -> str:
+    # only promise offline fonts when render actually inlined some
+    embedded = b"@font-face" in (outdir / "notes.html").read_bytes()
+    return README + README_FONTS if embedded else README
+
+
+def _write_tar_zst(
+    outdir: Path, files: List[Tuple[Path, int]], mani: Dict, readme: str, out: Path
+) -> Path:
+    if not ZSTD:
+        raise RuntimeError("zstandard is not installed; pip install 'whisper-to-cards[zstd]'.")
+
+    def add_bytes(tar: tarfile.TarFile, name: str, data: bytes):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(data))
+
+    # threads=-1: one compression worker per core
+    cctx = zstd.ZstdCompressor(level=3, threads=-1)
+    with out.open("wb") as fh, cctx.stream_writer(fh) as zfh:
+        with tarfile.open(fileobj=zfh, mode="w|") as tar:
+            for p, _ in files:
+                tar.add(p, arcname=str(p.relative_to(outdir).as_posix()), recursive=False)
+            add_bytes(tar, "manifest.json", orjson.dumps(mani, option=orjson.OPT_INDENT_2))
+            add_bytes(tar, "README.txt", readme.encode("utf-8"))
+    return out
+
+
+def make_zip(
+    outdir: Path, zip_path: Path, include_pdf: bool = True, fmt: str = "zip"
+) -> Path:
+    """Bundle outdir into zip_path.
+
+    fmt="zip"  deflate (level 1), readable everywhere.
+    fmt="zst"  zstandard: a zstd-compressed .zip where zipfile supports it
+               (Python 3.14+), otherwise a .tar.zst next to zip_path written
+               with multithreaded `zstandard`. Returns the path written.
+    """
+    if fmt not in ("zip", "zst"):
+        raise ValueError(f"unknown bundle format: {fmt!r}")
     outdir = outdir.resolve()
     files = _gather(outdir, include_pdf=include_pdf)
     mani = _manifest(files, outdir)
+    readme = _readme(outdir)
     zip_path.parent.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+
+    method, level = zipfile.ZIP_DEFLATED, 1
+    if fmt == "zst":
+        method = getattr(zipfile, "ZIP_ZSTANDARD", None)
+        if method is None:
+            stem = zip_path.name.removesuffix(".zip")
+            return _write_tar_zst(outdir, files, mani, readme, zip_path.with_name(f"{stem}.tar.zst"))
+        level = 3
+
+    with zipfile.ZipFile(zip_path, "w", compression=method, compresslevel=level) as z:
         # add files under their relative paths
-        for p in files:
-            z.write(p, arcname=str(p.relative_to(outdir).as_posix()))
+        for p, _ in files:
+            ctype = zipfile.ZIP_STORED if p.suffix.lower() in STORED_SUFFIXES else method
+            z.write(p, arcname=str(p.relative_to(outdir).as_posix()), compress_type=ctype)
         # include a manifest for traceability
-        z.writestr("manifest.json", json.dumps(mani, indent=2))
-
+        z.writestr("manifest.json", orjson.dumps(mani, option=orjson.OPT_INDENT_2))
         # small landing README inside the zip
-        readme = (
-            "# Whisper-to-Cards bundle\n\n"
-            "Open **notes.html** in a browser (works offline).\n\n"
-            "- **notes.pdf** is included if we could generate it.\n"
-            "- **audio/** has per-section audio if you created it.\n"
-            "- **fonts/** are embedded so the page renders offline.\n"
-        )
         z.writestr("README.txt", readme)
 
     return zip_path
@@ -1,42 +1,33 @@
 from __future__ import annotations
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List
-import json
-import html
+from typing import Dict, Any, List, TextIO
+import base64
+import io
+import os
 from importlib.resources import files as pkg_files
 
-try:
-    from weasyprint import HTML, CSS
+import orjson
 
-    WEASYPRINT_AVAILABLE = True
+try:
+    from rcssmin import cssmin as _cssmin  # optional
 except Exception:
-    WEASYPRINT_AVAILABLE = False
+
+    def _cssmin(css: str) -> str:
+        return css
 
 
 # ---------- I/O ----------
 
 
 def load_structured(path: Path) -> Dict[str, Any]:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return orjson.loads(path.read_bytes())
 
 
 def ensure_outdir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
 
-def _copy_embedded_fonts(dest_dir: Path) -> None:
-    """Copy packaged fonts into outdir/fonts (supports .ttf/.otf/.woff/.woff2)."""
-    try:
-        src = pkg_files("whisper_to_cards") / "assets" / "fonts"
-        dest_dir.mkdir(parents=True, exist_ok=True)
-        for p in src.iterdir():
-            if p.suffix.lower() in (".ttf", ".otf", ".woff", ".woff2"):
-                (dest_dir / p.name).write_bytes(p.read_bytes())
-    except Exception:
-        # If assets are not packaged, skip silently.
-        pass
-
-
 # ---------- CSS ----------
 
 ACCESSIBLE_CSS = r"""
@@ -104,33 +95,87 @@ a { color: var(--accent); text-decoration: underline; }
 .dark { --accent: #93c1ff; }               /* dark */
 """
 
-# Local @font-face rules. Adjust filenames if you used different ones.
-FONTS_CSS = r"""
-@font-face {
-  font-family: 'Lexend';
-  src:
-    url('fonts/Lexend-VariableFont_wght.woff2') format('woff2'),
-    url('fonts/Lexend-VariableFont_wght.ttf') format('truetype');
-  font-weight: 100 900; font-style: normal; font-display: swap;
-}
-/* If you also fetched OpenDyslexic (.otf or .ttf) */
-@font-face {
-  font-family: 'OpenDyslexic';
-  src:
-    url('fonts/OpenDyslexic-Regular.woff2') format('woff2'),
-    url('fonts/OpenDyslexic-Regular.woff') format('woff'),
-    url('fonts/OpenDyslexic-Regular.otf') format('opentype'),
-    url('fonts/OpenDyslexic-Regular.ttf') format('truetype');
-  font-weight: 400; font-style: normal; font-display: swap;
+ACCESSIBLE_CSS_MIN = _cssmin(ACCESSIBLE_CSS)
+
+
+def _page_css() -> str:
+    # WHISPER_DEBUG_CSS=1 keeps the readable stylesheet in the output
+    return ACCESSIBLE_CSS if os.environ.get("WHISPER_DEBUG_CSS") else ACCESSIBLE_CSS_MIN
+
+
+# @font-face families and their candidate packaged files, best format first.
+# Only the first file present is inlined so each face is embedded once.
+_FONT_FACES = [
+    ("Lexend", "100 900", ["Lexend-VariableFont_wght.woff2", "Lexend-VariableFont_wght.ttf"]),
+    (
+        "OpenDyslexic",
+        "400",
+        [
+            "OpenDyslexic-Regular.woff2",
+            "OpenDyslexic-Regular.woff",
+            "OpenDyslexic-Regular.otf",
+            "OpenDyslexic-Regular.ttf",
+        ],
+    ),
+]
+_FONT_FORMATS = {
+    ".woff2": ("font/woff2", "woff2"),
+    ".woff": ("font/woff", "woff"),
+    ".otf": ("font/otf", "opentype"),
+    ".ttf": ("font/ttf", "truetype"),
 }
-"""
+# sfnt / WOFF / WOFF2 signatures
+_FONT_MAGIC = (b"\x00\x01\x00\x00", b"OTTO", b"true", b"wOFF", b"wOF2")
+
+
+@lru_cache(maxsize=1)
+def _fonts_css() -> str:
+    """@font-face rules with the packaged fonts inlined as base64 data: URLs.
+
+    Read once per process; the HTML (and the PDF built from it) is then
+    self-contained, so nothing has to be copied next to notes.html.
+    """
+    try:
+        src = pkg_files("whisper_to_cards") / "assets" / "fonts"
+        available = {p.name: p for p in src.iterdir()}
+    except Exception:
+        # If assets are not packaged, fall back to system/web fonts.
+        return ""
+    rules = []
+    for family, weight, names in _FONT_FACES:
+        name = next((n for n in names if n in available), None)
+        if name is None:
+            continue
+        raw = available[name].read_bytes()
+        if not raw.startswith(_FONT_MAGIC):
+            # e.g. an HTML error page saved under a font name; don't inline junk
+            continue
+        mime, fmt = _FONT_FORMATS[Path(name).suffix.lower()]
+        data = base64.b64encode(raw).decode("ascii")
+        rules.append(
+            "@font-face {\n"
+            f"  font-family: '{family}';\n"
+            f"  src: url(data:{mime};base64,{data}) format('{fmt}');\n"
+            f"  font-weight: {weight}; font-style: normal; font-display: swap;\n"
+            "}\n"
+        )
+    return "".join(rules)
+
+
+def has_embedded_fonts() -> bool:
+    """True when --embed-fonts will actually inline at least one font."""
+    return bool(_fonts_css())
 
 
 # ---------- HTML ----------
 
 
+# same entities as html.escape(quote=True), applied in a single pass
+_ESC = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"})
+
+
 def _escape(s: str) -> str:
-    return html.escape(s or "")
+    return (s or "").translate(_ESC)
 
 
 def _render_section(
@@ -144,40 +189,37 @@ def _render_section(
     terms: List[Dict[str, str]] = sec.get("terms", []) or []
     sid = _escape(sec.get("id", ""))
 
-    bullets_html = "".join(f"<li>{_escape(b)}</li>" for b in bullets)
+    parts = [
+        '\n    <section class="section" aria-labelledby="', sid, '">\n      <h2 id="', sid, '">',
+        title, '</h2>\n      <div class="tldr"><b>TL;DR:</b> ', tldr, "</div>\n      ",
+    ]
 
-    audio_html = ""
     if audio_lookup and audio_dir:
         fname = audio_lookup.get(sec.get("id", ""))
         if fname:
             audio_src = f"{audio_dir.rstrip('/')}/{fname}"
-            audio_html = f"<p><audio controls preload='none' src='{_escape(audio_src)}' aria-label='Audio for {sid}'></audio></p>"
+            parts += ["<p><audio controls preload='none' src='", _escape(audio_src),
+                      "' aria-label='Audio for ", sid, "'></audio></p>"]
+    parts.append("\n      ")
+
+    if bullets:
+        parts.append("<h3>Key points</h3>\n      <ul>")
+        for b in bullets:
+            parts += ["<li>", _escape(b), "</li>"]
+        parts.append("</ul>\n      ")
+    else:
+        parts.append("\n      \n      ")
 
-    glossary_html = ""
     if terms:
-        gl_items = []
+        parts.append("\n        <h3>Glossary</h3>\n        <dl class='glossary'>\n          ")
         for t in terms:
             term = _escape(t.get("term", ""))
-            defin = _escape(t.get("def", ""))
             if term:
-                gl_items.append(f"<dt>{term}</dt><dd>{defin}</dd>")
-        glossary_html = f"""
-        <h3>Glossary</h3>
-        <dl class='glossary'>
-          {''.join(gl_items)}
-        </dl>
-        """
-
-    return f"""
-    <section class="section" aria-labelledby="{sid}">
-      <h2 id="{sid}">{title}</h2>
-      <div class="tldr"><b>TL;DR:</b> {tldr}</div>
-      {audio_html}
-      {'<h3>Key points</h3>' if bullets else ''}
-      {'<ul>' + bullets_html + '</ul>' if bullets else ''}
-      {glossary_html}
-    </section>
-    """
+                parts += ["<dt>", term, "</dt><dd>", _escape(t.get("def", "")), "</dd>"]
+        parts.append("\n        </dl>\n        ")
+
+    parts.append("\n    </section>\n    ")
+    return "".join(parts)
 
 
 def build_html(
@@ -186,10 +228,12 @@ def build_html(
     audio_lookup: Dict[str, str] | None = None,
     audio_dir: str | None = None,
     embed_fonts: bool = True,
-) -> str:
+    out: TextIO | None = None,
+) -> str | None:
+    """Build the notes page. With `out`, fragments are written to it as they
+    are produced (one section in memory at a time) and None is returned."""
     sections = structured.get("sections", [])
     meta_src = _escape(structured.get("meta", {}).get("source", ""))
-    sec_html = "\n".join(_render_section(s, audio_lookup, audio_dir) for s in sections)
 
     # Web Lexend for online fallback. Local @font-face takes precedence when present.
     web_fonts = "<link href='https://fonts.googleapis.com/css2?family=Lexend:wght@100..900&display=swap' rel='stylesheet'>"
@@ -259,26 +303,29 @@ def build_html(
 </header>
 """
 
-    fonts_css = FONTS_CSS if embed_fonts else ""
-    return f"""<!doctype html>
-<html lang="en">
-<head>
-  <meta charset="utf-8" />
-  <title>{_escape(title)}</title>
-  {web_fonts}
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>{fonts_css}{ACCESSIBLE_CSS}</style>
-</head>
-<body>
-  <main id="main" role="main" tabindex="-1">
-    {header}
-    {sec_html}
-    <p class="footer-note">Generated by Whisper-to-Cards.</p>
-  </main>
-  {js}
-</body>
-</html>
-"""
+    buf = out if out is not None else io.StringIO()
+    buf.writelines([
+        '<!doctype html>\n<html lang="en">\n<head>\n  <meta charset="utf-8" />\n  <title>',
+        _escape(title),
+        "</title>\n  ",
+        web_fonts,
+        '\n  <meta name="viewport" content="width=device-width, initial-scale=1" />\n  <style>',
+        _fonts_css() if embed_fonts else "",
+        _page_css(),
+        '</style>\n</head>\n<body>\n  <main id="main" role="main" tabindex="-1">\n    ',
+        header,
+        "\n    ",
+    ])
+    for i, s in enumerate(sections):
+        if i:
+            buf.write("\n")
+        buf.write(_render_section(s, audio_lookup, audio_dir))
+    buf.writelines([
+        '\n    <p class="footer-note">Generated by Whisper-to-Cards.</p>\n  </main>\n  ',
+        js,
+        "\n</body>\n</html>\n",
+    ])
+    return buf.getvalue() if out is None else None
 
 
 def write_html(
@@ -290,16 +337,15 @@ def write_html(
     embed_fonts: bool = True,
 ) -> Path:
     ensure_outdir(out_html.parent)
-    if embed_fonts:
-        _copy_embedded_fonts(out_html.parent / "fonts")
-    html_str = build_html(
-        structured,
-        title=title,
-        audio_lookup=audio_lookup,
-        audio_dir=audio_dir,
-        embed_fonts=embed_fonts,
-    )
-    out_html.write_text(html_str, encoding="utf-8")
+    with out_html.open("w", encoding="utf-8", buffering=1 << 20) as fh:
+        build_html(
+            structured,
+            title=title,
+            audio_lookup=audio_lookup,
+            audio_dir=audio_dir,
+            embed_fonts=embed_fonts,
+            out=fh,
+        )
     return out_html
 
 
@@ -309,14 +355,15 @@ def write_pdf(
     title: str = "Easy-Read Notes",
     embed_fonts: bool = True,
 ) -> Path:
-    if not WEASYPRINT_AVAILABLE:
-        raise RuntimeError("WeasyPrint is not installed or failed to import.")
+    # imported here so HTML-only renders never pay WeasyPrint's (large) import cost
+    try:
+        from weasyprint import HTML, CSS
+    except Exception as e:
+        raise RuntimeError("WeasyPrint is not installed or failed to import.") from e
     ensure_outdir(out_pdf.parent)
-    if embed_fonts:
-        _copy_embedded_fonts(out_pdf.parent / "fonts")
-    # base_url is key so @font-face url('fonts/...') resolves for PDF
+    # fonts travel inline in the page's <style>; don't parse the data: URLs twice
     html_str = build_html(structured, title=title, embed_fonts=embed_fonts)
     HTML(string=html_str, base_url=str(out_pdf.parent)).write_pdf(
-        str(out_pdf), stylesheets=[CSS(string=FONTS_CSS + ACCESSIBLE_CSS)]
+        str(out_pdf), stylesheets=[CSS(string=_page_css())]
     )
     return out_pdf
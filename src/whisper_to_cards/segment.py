@@ -1,10 +1,13 @@
 from __future__ import annotations
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
 from typing import List, Tuple
-import json
 import re
 
+import numpy as np
+import orjson
+
 
 @dataclass
 class Section:
@@ -17,19 +20,18 @@ class Section:
 
 
 def _load_transcript(path: Path) -> dict:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return orjson.loads(path.read_bytes())
 
 
-def _should_break(prev_text: str, curr_text: str) -> bool:
-    cues = (
-        r"^so[, ]",
-        r"^in (conclusion|summary)",
-        r"^next[, ]",
-        r"^now[, ]",
-        r"^okay[, ]",
-        r"^let'?s",
-    )
-    if any(re.match(pat, curr_text.lower()) for pat in cues):
+# end of a section's first sentence. Titles keep at most 70 chars of it, so
+# only that prefix is searched, and nothing past it is split off and copied.
+_SENT_END = re.compile(r"[.!?]")
+_BREAK_RE = re.compile(r"^(?:so[, ]|in (?:conclusion|summary)|next[, ]|now[, ]|okay[, ]|let'?s)")
+
+
+def _should_break(prev_text: str, curr_text: str, low: str | None = None) -> bool:
+    # `low` lets the caller pass an already-lowered curr_text
+    if _BREAK_RE.match(curr_text.lower() if low is None else low):
         return True
     if prev_text.endswith((".", "?", "!")) and curr_text[:1].isupper():
         return True
@@ -40,57 +42,76 @@ def segment_transcript(
     transcript_path: Path, max_chars: int = 1200, max_segments: int = 200
 ) -> List[Section]:
     data = _load_transcript(transcript_path)
-    segs = data["segments"]
+    segs = data["segments"][:max_segments]
 
+    # keep non-empty segments along with their index in the transcript
+    orig: List[int] = []
+    texts: List[str] = []
+    ts: List[Tuple[float, float]] = []
+    for i, s in enumerate(segs):
+        t = (s.get("text") or "").strip()
+        if t:
+            orig.append(i)
+            texts.append(t)
+            ts.append((float(s["start"]), float(s["end"])))
+    n = len(texts)
     sections: List[Section] = []
-    buff_text, buff_ts = [], []
-    start_idx = 0
-    char_count = 0
-
-    def flush(end_idx: int):
-        nonlocal start_idx, buff_text, buff_ts, char_count, sections
-        if not buff_text:
-            return
-        text = " ".join(buff_text).strip()
+    if not n:
+        return sections
+
+    # A cue break before segment k only depends on segments k-1 and k, so
+    # find them all up front. Only the first 16 chars are lowered: that
+    # covers the longest cue ("in conclusion").
+    cue = np.flatnonzero(
+        [False]
+        + [_should_break(texts[k - 1], texts[k], texts[k][:16].lower()) for k in range(1, n)]
+    )
+    # cum[k] = chars in texts[:k + 1]; a section starting at s reaches
+    # max_chars after segment j = searchsorted(cum, cum[s - 1] + max_chars)
+    cum = np.cumsum(np.fromiter(map(len, texts), dtype=np.int64, count=n))
+
+    start = 0
+    while start < n:
+        base = int(cum[start - 1]) if start else 0
+        # a section always takes its first segment, even if max_chars <= 0
+        by_len = max(int(np.searchsorted(cum, base + max_chars)) + 1, start + 1)
+        c = int(np.searchsorted(cue, start, side="right"))
+        by_cue = int(cue[c]) if c < len(cue) else n
+        end = min(by_len, by_cue, n)
+
+        text = " ".join(texts[start:end]).strip()
+        m = _SENT_END.search(text, 0, 70)
         title = (
-            re.split(r"[.!?]", text, maxsplit=1)[0][:70].strip()
+            text[: m.start() if m else 70].strip()
             or f"Section {len(sections)+1}"
         )
-        sec = Section(
-            id=f"sec_{len(sections)+1:02d}",
-            title=title,
-            start_idx=start_idx,
-            end_idx=end_idx,
-            text=text,
-            timestamps=buff_ts[:],
+        sections.append(
+            Section(
+                id=f"sec_{len(sections)+1:02d}",
+                title=title,
+                start_idx=orig[start] if sections else 0,
+                end_idx=orig[end] - 1 if end < n else len(segs) - 1,
+                text=text,
+                timestamps=ts[start:end],
+            )
         )
-        sections.append(sec)
-        buff_text, buff_ts = [], []
-        char_count = 0
+        start = end
 
-    for i, s in enumerate(segs[:max_segments]):
-        t = (s.get("text") or "").strip()
-        if not t:
-            continue
-        if buff_text and (char_count >= max_chars or _should_break(buff_text[-1], t)):
-            flush(i - 1)
-            start_idx = i
-        buff_text.append(t)
-        buff_ts.append((float(s["start"]), float(s["end"])))
-        char_count += len(t)
-
-    flush(len(segs[:max_segments]) - 1)
-
-    # merge very short trailing sections
-    merged: List[Section] = []
+    # merge very short trailing sections: group each head with the short
+    # sections after it, then join every run once
+    runs: List[List[Section]] = []
     for sec in sections:
-        if merged and len(sec.text) < 200:
-            prev = merged[-1]
-            prev.text = (prev.text + " " + sec.text).strip()
-            prev.end_idx = sec.end_idx
-            prev.timestamps.extend(sec.timestamps)
+        if runs and len(sec.text) < 200:
+            runs[-1].append(sec)
         else:
-            merged.append(sec)
+            runs.append([sec])
+    merged: List[Section] = []
+    for head, *tail in runs:
+        if tail:
+            head.text = " ".join([head.text, *(f.text for f in tail)]).strip()
+            head.end_idx = tail[-1].end_idx
+            head.timestamps = head.timestamps + list(chain.from_iterable(f.timestamps for f in tail))
+        merged.append(head)
     return merged
 
 
@@ -98,8 +119,9 @@ def write_sections(
     sections: List[Section], out_path: Path, meta: dict | None = None
 ) -> Path:
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    payload = {"meta": meta or {}, "sections": [asdict(s) for s in sections]}
-    out_path.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8"
+    # orjson serialises the Section dataclasses natively
+    payload = {"meta": meta or {}, "sections": sections}
+    out_path.write_bytes(
+        orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
     )
     return out_path
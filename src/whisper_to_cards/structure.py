@@ -1,95 +1,130 @@
 from __future__ import annotations
-from dataclasses import dataclass, asdict
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Dict, Any
-import json
+from typing import Iterator, List, Dict, Any, Tuple
 import re
+import string
+import sys
 
-
-@dataclass
-class StructuredSection:
-    id: str
-    title: str
-    bullets: List[str]
-    tldr: str
-    terms: List[Dict[str, str]]
-    cloze: List[str]
+import ijson
+import orjson
 
 
 # add near the top
 _STOP_END = (".", "!", "?")
 
 
-def _clean_bullets(bullets: List[str]) -> List[str]:
+def _clean_bullets(bullets: List[Tuple[str, str]], tldr_key: str = "") -> List[str]:
+    """`bullets` are (text, lowered text) pairs from _summarize. Drop the one
+    that repeats the TL;DR (`tldr_key`, already stripped and lowered), end each
+    with punctuation, de-dup case-insensitively."""
     seen = set()
     out = []
-    for b in bullets:
-        bb = b.strip()
-        if not bb:
+    for bb, key in bullets:
+        if not bb or key == tldr_key:
             continue
         if not bb.endswith(_STOP_END):
             bb += "."
-        key = bb.lower()
+            key += "."
         if key not in seen:
             seen.add(key)
             out.append(bb)
     return out[:6]
 
 
-def _load_sections(path: Path) -> dict:
-    return json.loads(path.read_text(encoding="utf-8"))
+def _iter_sections(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield sections.json's sections one at a time instead of parsing the whole file."""
+    with path.open("rb") as f:
+        yield from ijson.items(f, "sections.item", use_float=True)
 
 
 _sentence_split = re.compile(r"(?<=[.!?])\s+")
+_WS = re.compile(r"\s+")
+_NONWORD = re.compile(r"[^\w\-]")
+# _NONWORD.sub("", w) for ASCII words as one C-level translate: drop every
+# ASCII char that isn't a letter, digit, "_" or "-"
+_PUNCT_KEEP = frozenset(string.ascii_letters + string.digits + "-_")
+_PUNCT_TABLE = str.maketrans("", "", "".join(c for c in map(chr, range(0x80)) if c not in _PUNCT_KEEP))
+
+
+def _strip_punct(w: str) -> str:
+    # non-ASCII words still need the regex: \w covers letters like "é" but not "…"
+    return w.translate(_PUNCT_TABLE) if w.isascii() else _NONWORD.sub("", w)
+
+
+def _iter_sentences(text: str) -> Iterator[str]:
+    """Stripped, non-empty sentences, yielded lazily so callers that stop early
+    never split the whole text."""
+    pos = 0
+    for m in _sentence_split.finditer(text):
+        s = text[pos : m.start()].strip()
+        if s:
+            yield s
+        pos = m.end()
+    s = text[pos:].strip()
+    if s:
+        yield s
+
+
+def _shorten(s: str, max_len: int) -> str:
+    return s if len(s) <= max_len else (s[: max_len - 1].rstrip() + "…")
 
 
-def _sentences(text: str) -> List[str]:
-    return [s.strip() for s in _sentence_split.split(text) if s.strip()]
-
-
-def _make_bullets(text: str, max_items: int = 6, max_len: int = 140) -> List[str]:
-    """Heuristic bullets: first N meaningful sentences; truncate gently."""
-    out = []
-    for s in _sentences(text):
-        s = re.sub(r"\s+", " ", s)
-        if 15 <= len(s) <= max_len:
-            out.append(s)
-        elif len(s) > max_len:
-            out.append(s[: max_len - 1].rstrip() + "…")
-        if len(out) >= max_items:
-            break
-    # prefer leading-verb style (soft heuristic)
-    return out
-
-
-def _make_tldr(text: str, max_len: int = 160) -> str:
-    if not text:
-        return ""
-    first = _sentences(text)[0] if _sentences(text) else text
-    s = re.sub(r"\s+", " ", first)
-    return s if len(s) <= max_len else (s[: max_len - 1].rstrip() + "…")
+def _summarize(
+    text: str, max_items: int = 6, max_len: int = 140, tldr_len: int = 160
+) -> Tuple[List[Tuple[str, str]], str]:
+    """One pass over the sentences → (bullets, tldr).
+
+    TL;DR is the first sentence; bullets are the first `max_items` sentences
+    of 15+ chars (truncated gently), each paired with its lowercase key. The
+    caller drops a bullet equal to the TL;DR via _clean_bullets.
+    """
+    bullets: List[Tuple[str, str]] = []
+    tldr = None
+    for s in _iter_sentences(text):
+        s = _WS.sub(" ", s)
+        if tldr is None:
+            tldr = _shorten(s, tldr_len)
+        if len(s) >= 15:
+            b = _shorten(s, max_len)  # sentences arrive stripped, so no strip() needed
+            bullets.append((b, b.lower()))
+            if len(bullets) >= max_items:
+                break
+    if tldr is None:
+        tldr = _shorten(_WS.sub(" ", text), tldr_len) if text else ""
+    return bullets, tldr
 
 
-_np = re.compile(r"\b([A-Z][a-zA-Z0-9\-]*(?:\s+[A-Z][a-zA-Z0-9\-]*){0,3})\b")
+# Runs of up to 4 capitalised words; no capture group, group 0 is all we read.
+# The classes around \s+ are disjoint and the repeat is bounded, so finditer
+# is a single linear scan.
+_np = re.compile(r"\b[A-Z][a-zA-Z0-9\-]*(?:\s+[A-Z][a-zA-Z0-9\-]*){0,3}\b")
+# Same matches on ASCII text, without Unicode lookups for \b and \s.
+# Unicode \s also covers \x1c-\x1f, so they're added back explicitly.
+_np_ascii = re.compile(
+    r"\b[A-Z][a-zA-Z0-9\-]*(?:[\s\x1c-\x1f]+[A-Z][a-zA-Z0-9\-]*){0,3}\b", re.ASCII
+)
 
 
 def _extract_terms(text: str, max_items: int = 8) -> List[Dict[str, str]]:
     """Very naive term extractor: capitalized noun-phrases; de-dup; keep short."""
     candidates = []
     seen = set()
-    for m in _np.finditer(text):
-        term = m.group(1).strip()
-        if len(term) < 3 or len(term.split()) > 4:
+    for m in (_np_ascii if text.isascii() else _np).finditer(text):
+        # a match never has surrounding whitespace or more than 4 words;
+        # interned, since the same term recurs across sections and the glossary
+        term = sys.intern(m.group())
+        if len(term) < 3:
             continue
         low = term.lower()
         if low not in seen:
             seen.add(low)
             candidates.append(term)
-        if len(candidates) >= 30:
-            break
+            # only the first max_items survive, so stop scanning there
+            if len(candidates) >= max_items:
+                break
     # simple definitions placeholder (will improve later or with LLM)
-    terms = [{"term": t, "def": ""} for t in candidates[:max_items]]
-    return terms
+    return [{"term": t, "def": ""} for t in candidates[:max_items]]
 
 
 _STOPWORDS = {
@@ -136,7 +171,9 @@ def _make_cloze(
         if not new_b:
             words = b.split()
             for i in range(len(words) - 1, -1, -1):
-                w = re.sub(r"[^\w\-]", "", words[i])
+                if len(words[i]) < 4:
+                    continue  # stripping only shortens a token
+                w = _strip_punct(words[i])
                 if len(w) >= 4 and w.lower() not in _STOPWORDS:
                     words[i] = "{{c1::" + w + "}}"
                     new_b = " ".join(words)
@@ -148,46 +185,50 @@ def _make_cloze(
     return cloze
 
 
-def structure_sections(sections_json: Path) -> Dict[str, Any]:
-    data = _load_sections(sections_json)
-    structured: List[StructuredSection] = []
-    for sec in data.get("sections", []):
-        text = sec.get("text", "")
-        title = sec.get("title", "").strip() or "Untitled section"
-        bullets = _make_bullets(text)
-        tldr = _make_tldr(text)
-        bullets = [b for b in bullets if b.strip().lower() != tldr.strip().lower()]
-        bullets = _clean_bullets(bullets)
-        terms = _extract_terms(text)
-        cloze = _make_cloze(bullets, terms)
-        structured.append(
-            StructuredSection(
-                id=sec["id"],
-                title=title,
-                bullets=bullets,
-                tldr=tldr,
-                terms=terms,
-                cloze=cloze,
-            )
-        )
+def structure_sections(
+    sections_json: Path, jsonl_out: Path | None = None
+) -> Dict[str, Any]:
+    """Build the structured notes payload. With `jsonl_out`, each section is
+    also written there as one JSON line as soon as it is done."""
+    # plain dicts (id/title/bullets/tldr/terms/cloze): asdict() would deep-copy
+    # every list just to hand it to the serializer
+    structured: List[Dict[str, Any]] = []
+    # glossary and takeaways are gathered in the same pass
+    glossary: Dict[str, str] = {}  # stripped term -> def, first section wins
+    takeaways: List[str] = []
+    with jsonl_out.open("wb") if jsonl_out else nullcontext() as sink:
+        for sec in _iter_sections(sections_json):
+            text = sec.get("text", "")
+            title = sec.get("title", "").strip() or "Untitled section"
+            if not text or text.isspace():
+                # title-only section: nothing for the regex passes to find
+                bullets, tldr, terms, cloze = [], "", [], []
+            else:
+                bullets, tldr = _summarize(text)
+                bullets = _clean_bullets(bullets, tldr.strip().lower())
+                terms = _extract_terms(text)
+                for t in terms:
+                    key = t["term"].strip()
+                    if key and key not in glossary:
+                        glossary[key] = t["def"]
+                if tldr:
+                    takeaways.append(tldr)  # one-line takeaway per section
+                cloze = _make_cloze(bullets, terms)
+            s = {
+                "id": sys.intern(sec["id"]),
+                "title": title,
+                "bullets": bullets,
+                "tldr": tldr,
+                "terms": terms,
+                "cloze": cloze,
+            }
+            structured.append(s)
+            if sink:
+                sink.write(orjson.dumps(s, option=orjson.OPT_APPEND_NEWLINE))
     return {
         "meta": {"source": str(sections_json), "version": 1},
-        "sections": [asdict(s) for s in structured],
-        "glossary": _merge_glossary(structured),
-        "takeaways": _collect_takeaways(structured),
+        "sections": structured,
+        "glossary": [{"term": k, "def": v} for k, v in glossary.items()],
+        "takeaways": takeaways,
     }
 
-
-def _merge_glossary(items: List[StructuredSection]) -> List[Dict[str, str]]:
-    g: Dict[str, str] = {}
-    for s in items:
-        for t in s.terms:
-            key = t["term"].strip()
-            if key and key not in g:
-                g[key] = t["def"]
-    return [{"term": k, "def": v} for k, v in g.items()]
-
-
-def _collect_takeaways(items: List[StructuredSection]) -> List[str]:
-    # one-line takeaway per section (use TL;DR)
-    return [s.tldr for s in items if s.tldr]
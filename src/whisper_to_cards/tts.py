@@ -1,28 +1,86 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any
-import json
-import subprocess
-from pydub import AudioSegment  # needs ffmpeg on PATH
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Any, Iterator, Tuple
+import hashlib
+import os
+import re
+import shutil
+import subprocess  # espeak-ng and ffmpeg must be on PATH
+import threading
+
+import ijson
+import orjson
 
 
 def load_structured(path: Path) -> Dict[str, Any]:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return orjson.loads(path.read_bytes())
 
 
-def _espeak_wav(
-    text: str, out_wav: Path, voice: str = "en-us", rate: int = 170
-) -> None:
-    out_wav.parent.mkdir(parents=True, exist_ok=True)
-    # espeak-ng writes WAV directly
-    cmd = ["espeak-ng", "-v", voice, "-s", str(rate), "-w", str(out_wav), text]
-    subprocess.run(cmd, check=True)
+def _iter_sections(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield structured.json's sections one at a time instead of parsing the whole file."""
+    with path.open("rb") as f:
+        yield from ijson.items(f, "sections.item", use_float=True)
 
 
-def _wav_to_mp3(wav_path: Path, mp3_path: Path, bitrate: str = "128k") -> None:
-    audio = AudioSegment.from_wav(wav_path)
+def _espeak_mp3(
+    text: str, mp3_path: Path, voice: str = "en-us", rate: int = 170, bitrate: str = "128k"
+) -> None:
+    """espeak-ng --stdout piped straight into ffmpeg; no WAV touches the disk."""
     mp3_path.parent.mkdir(parents=True, exist_ok=True)
-    audio.export(str(mp3_path), format="mp3", bitrate=bitrate)
+    # encode to a temp name so a crash never leaves a truncated file that the
+    # cache in build_section_audio would then trust
+    tmp = mp3_path.with_name(mp3_path.name + ".part")
+    espeak = subprocess.Popen(
+        ["espeak-ng", "-v", voice, "-s", str(rate), "--stdout", text],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        try:
+            subprocess.run(
+                ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                 "-i", "pipe:0", "-c:a", "libmp3lame", "-b:a", bitrate, "-f", "mp3", str(tmp)],
+                stdin=espeak.stdout,
+                check=True,
+            )
+        finally:
+            # close our copy so espeak-ng sees EPIPE if ffmpeg died early
+            espeak.stdout.close()
+            rc = espeak.wait()
+        if rc:
+            raise subprocess.CalledProcessError(rc, espeak.args)
+        os.replace(tmp, mp3_path)
+    except BaseException:
+        # whichever side failed, don't leave a .part for the bundle to pick up
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _section_text(sec: Dict[str, Any], source: str) -> str:
+    if source == "bullets":
+        # join first 3 bullets, keep short
+        bullets = sec.get("bullets", [])[:3]
+        text = ". ".join(bullets)
+    else:
+        text = sec.get("tldr", "") or (sec.get("title", "") or "")
+    return (text or "").strip()
+
+
+# "{sid}-<16 hex>.mp3": the names build_section_audio gives its takes
+_TAKE = re.compile(r".+-[0-9a-f]{16}\.mp3")
+
+
+def _audio_key(text: str, voice: str, rate: int) -> str:
+    return hashlib.blake2b(f"{voice}|{rate}|{text}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:  # no hardlinks here (FAT, some network mounts) or cross-device
+        shutil.copyfile(src, dst)
 
 
 def build_section_audio(
@@ -34,35 +92,80 @@ def build_section_audio(
 ) -> Dict[str, str]:
     """
     Returns a map {section_id: relative mp3 path} for sections that produced audio.
+
+    MP3s are named {sid}-{hash of voice|rate|text}.mp3, so re-runs only
+    synthesise sections whose text or voice settings changed; sections sharing
+    a text within one run are hardlinked (or copied) to a single take.
     """
-    data = load_structured(structured_json)
     outdir.mkdir(parents=True, exist_ok=True)
-    audio_map: Dict[str, str] = {}
+    # one line per finished section, in completion order, for consumers that
+    # don't want to wait for audio_map.json
+    jsonl = (outdir / "audio_map.jsonl").open("wb")
+    lock = threading.Lock()
+    # key -> (first mp3 for that key, set once it's written): sections with the
+    # same text are synthesised once per run and linked to the rest
+    first_take: Dict[str, Tuple[Path, threading.Event]] = {}
 
-    for sec in data.get("sections", []):
+    def _render_one(sec: Dict[str, Any]) -> Tuple[str, str, str] | None:
         sid = sec.get("id", "sec")
-        if source == "bullets":
-            # join first 3 bullets, keep short
-            bullets = sec.get("bullets", [])[:3]
-            text = ". ".join(bullets)
-        else:
-            text = sec.get("tldr", "") or (sec.get("title", "") or "")
-        text = (text or "").strip()
+        text = _section_text(sec, source)
         if not text:
-            continue
+            return None
+        key = _audio_key(text, voice, rate)
+        mp3_path = outdir / f"{sid}-{key}.mp3"
+        with lock:
+            owner = key not in first_take
+            if owner:
+                first_take[key] = (mp3_path, threading.Event())
+            src, ready = first_take[key]
+        if owner:
+            try:
+                if not mp3_path.exists():
+                    _espeak_mp3(text, mp3_path, voice=voice, rate=rate)
+            finally:
+                ready.set()
+        elif not mp3_path.exists():
+            ready.wait()
+            if src.exists():
+                _link_or_copy(src, mp3_path)
+            else:  # the first take failed; try again rather than go silent
+                _espeak_mp3(text, mp3_path, voice=voice, rate=rate)
+        line = orjson.dumps({"id": sid, "mp3": mp3_path.name}, option=orjson.OPT_APPEND_NEWLINE)
+        with lock:
+            jsonl.write(line)
+            jsonl.flush()
+        return sid, mp3_path.name, key  # store basename; HTML will use audio_dir + name
 
-        wav_path = outdir / f"{sid}.wav"
-        mp3_path = outdir / f"{sid}.mp3"
-        _espeak_wav(text, wav_path, voice=voice, rate=rate)
-        _wav_to_mp3(wav_path, mp3_path)
-        try:
-            wav_path.unlink()
-        except Exception:
-            pass
-        audio_map[sid] = mp3_path.name  # store basename; HTML will use audio_dir + name
+    # each section is its own espeak-ng | ffmpeg pipeline, so threads are
+    # enough to keep every core busy. Submit through a window of 2x workers
+    # rather than map(), which would pull every section in up front; popping
+    # from the left keeps the results in section order.
+    workers = os.cpu_count() or 4
+    done = []
+    with jsonl, ThreadPoolExecutor(max_workers=workers) as ex:
+        sections = _iter_sections(structured_json)
+        pending = deque(ex.submit(_render_one, sec) for sec in islice(sections, 2 * workers))
+        while pending:
+            r = pending.popleft().result()
+            if r:
+                done.append(r)
+            for sec in islice(sections, 1):
+                pending.append(ex.submit(_render_one, sec))
+    audio_map: Dict[str, str] = {sid: name for sid, name, _ in done}
+
+    # takes from earlier texts, or of sections that are gone, would end up in
+    # the bundle; hand-made {sid}.mp3 files don't match _TAKE and are kept
+    keep = set(audio_map.values())
+    with os.scandir(outdir) as it:
+        for e in it:
+            if e.name not in keep and _TAKE.fullmatch(e.name) and e.is_file():
+                os.unlink(e.path)
 
     # also save a small sidecar for debugging
-    (outdir / "audio_map.json").write_text(
-        json.dumps(audio_map, indent=2), encoding="utf-8"
+    (outdir / "audio_map.json").write_bytes(
+        orjson.dumps(audio_map, option=orjson.OPT_INDENT_2)
+    )
+    (outdir / "tts_cache.json").write_bytes(
+        orjson.dumps({sid: key for sid, _, key in done}, option=orjson.OPT_INDENT_2)
     )
     return audio_map
@@ -16,3 +16,22 @@ def test_structure_to_cards(tmp_path: Path):
     run("cards", str(tmp_path/"structured.json"), "-o", str(out), "--no-apkg")
     assert (out/"notes.html").exists()
     assert (out/"deck.csv").exists()
+
+def test_all_commands_registered():
+    from whisper_to_cards.cli import app
+    names = {c.name or c.callback.__name__ for c in app.registered_commands}
+    assert names == {"hello", "version", "segment", "asr", "structure", "cards", "render", "tts", "bundle"}
+    assert len(app.registered_commands) == 9
+
+def test_render_finds_audio_via_audio_map(tmp_path: Path):
+    s = {"sections":[{"id":"sec_01","title":"A","tldr":"One.","bullets":[]},{"id":"sec_02","title":"B","tldr":"Two.","bullets":[]}]}
+    (tmp_path/"structured.json").write_text(json.dumps(s), encoding="utf-8")
+    out = tmp_path/"out"; audio = out/"audio"; audio.mkdir(parents=True)
+    # tts output: hashed name recorded in audio_map.json; sec_02 is hand-made
+    (audio/"sec_01-0123456789abcdef.mp3").write_bytes(b"ID3")
+    (audio/"audio_map.json").write_text(json.dumps({"sec_01": "sec_01-0123456789abcdef.mp3"}), encoding="utf-8")
+    (audio/"sec_02.mp3").write_bytes(b"ID3")
+    run("render", str(tmp_path/"structured.json"), "-o", str(out), "--audio-dir", str(audio), "--no-pdf")
+    html = (out/"notes.html").read_text(encoding="utf-8")
+    assert "audio/sec_01-0123456789abcdef.mp3" in html
+    assert "audio/sec_02.mp3" in html
@@ -0,0 +1,33 @@
+from pathlib import Path
+import json
+
+from whisper_to_cards.segment import segment_transcript
+
+# ~250-300 chars, lowercase, no end punctuation: neither triggers a break nor
+# gets merged away as a short section
+A = "alpha " * 50
+B = "beta " * 50
+
+def bounds(tmp_path: Path, texts, **kw):
+    p = tmp_path/"transcript.json"
+    segs = [{"start": i, "end": i + 1, "text": t} for i, t in enumerate(texts)]
+    p.write_text(json.dumps({"segments": segs}), encoding="utf-8")
+    return [(s.start_idx, s.end_idx, len(s.timestamps)) for s in segment_transcript(p, **kw)]
+
+def test_cue_word_starts_a_section(tmp_path: Path):
+    assert bounds(tmp_path, [A, "so " + B]) == [(0, 0, 1), (1, 1, 1)]
+
+def test_max_chars_split(tmp_path: Path):
+    # a section keeps taking segments until it has gone past max_chars
+    assert bounds(tmp_path, [A, B, A, B], max_chars=600) == [(0, 2, 3), (3, 3, 1)]
+    assert bounds(tmp_path, [A, B, A, B], max_chars=500) == [(0, 1, 2), (2, 3, 2)]
+
+def test_non_positive_max_chars_takes_one_segment_each(tmp_path: Path):
+    assert bounds(tmp_path, [A, B, A], max_chars=0) == [(0, 0, 1), (1, 1, 1), (2, 2, 1)]
+    assert bounds(tmp_path, [A, B], max_chars=-5) == [(0, 0, 1), (1, 1, 1)]
+
+def test_empty_segments_count_towards_end_idx(tmp_path: Path):
+    # skipped segments belong to the section before them (or the first one)
+    assert bounds(tmp_path, [A, "", "  ", "so " + B, "", A]) == [(0, 2, 1), (3, 5, 2)]
+    assert bounds(tmp_path, ["", A, "so " + B]) == [(0, 1, 1), (2, 2, 1)]
+    assert bounds(tmp_path, [A, "so " + B, "", " "]) == [(0, 0, 1), (1, 3, 1)]
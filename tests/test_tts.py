@@ -0,0 +1,77 @@
+from pathlib import Path
+import json, os, stat
+
+import pytest
+
+from whisper_to_cards.tts import build_section_audio
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="shell-script stubs")
+
+# stand-ins for the real tools: espeak-ng writes fake WAV bytes to stdout and
+# ffmpeg drains stdin, logs the call and writes a stub MP3 to its last arg
+STUBS = {
+    "espeak-ng": '#!/bin/sh\nprintf RIFF\n',
+    "ffmpeg": '#!/bin/sh\ncat >/dev/null\necho "$@" >> "$W2C_FFMPEG_LOG"\n'
+              'for last; do :; done\necho ID3 > "$last"\n',
+}
+
+@pytest.fixture
+def ffmpeg_log(tmp_path: Path, monkeypatch) -> Path:
+    bindir = tmp_path/"bin"; bindir.mkdir()
+    for name, body in STUBS.items():
+        p = bindir/name
+        p.write_text(body)
+        p.chmod(p.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path/"ffmpeg.log"
+    monkeypatch.setenv("PATH", f"{bindir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("W2C_FFMPEG_LOG", str(log))
+    return log
+
+def calls(log: Path) -> int:
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+def write_structured(path: Path, tldrs):
+    secs = [{"id": f"sec_{i:02d}", "title": f"T{i}", "tldr": t} for i, t in enumerate(tldrs, 1)]
+    path.write_text(json.dumps({"sections": secs}), encoding="utf-8")
+    return path
+
+def test_cache_and_stale_cleanup(tmp_path: Path, ffmpeg_log: Path):
+    out = tmp_path/"audio"
+    structured = write_structured(tmp_path/"structured.json", ["One.", "Two."])
+    amap = build_section_audio(structured, out)
+    assert calls(ffmpeg_log) == 2
+    old = out/amap["sec_01"]
+    assert old.name.startswith("sec_01-") and old.name.endswith(".mp3")
+    assert json.loads((out/"audio_map.json").read_text()) == amap
+    assert set(json.loads((out/"tts_cache.json").read_text())) == {"sec_01", "sec_02"}
+
+    # unchanged texts: served from disk, nothing re-synthesised
+    assert build_section_audio(structured, out) == amap
+    assert calls(ffmpeg_log) == 2
+
+    # new text for sec_01: one synthesis, and its previous take is removed
+    (out/"sec_01.mp3").write_text("hand-made")  # not a hashed name; left alone
+    write_structured(structured, ["One, revised.", "Two."])
+    amap2 = build_section_audio(structured, out)
+    assert calls(ffmpeg_log) == 3
+    assert amap2["sec_01"] != amap["sec_01"] and amap2["sec_02"] == amap["sec_02"]
+    assert not old.exists() and (out/amap2["sec_01"]).exists()
+    assert (out/"sec_01.mp3").exists()
+    assert not list(out.glob("*.part"))
+
+    # sec_02 dropped from structured.json: its take goes too
+    write_structured(structured, ["One, revised."])
+    assert build_section_audio(structured, out) == {"sec_01": amap2["sec_01"]}
+    assert calls(ffmpeg_log) == 3
+    assert not (out/amap2["sec_02"]).exists()
+    assert sorted(p.name for p in out.glob("*.mp3")) == sorted([amap2["sec_01"], "sec_01.mp3"])
+
+def test_duplicate_texts_synthesised_once(tmp_path: Path, ffmpeg_log: Path):
+    out = tmp_path/"audio"
+    structured = write_structured(tmp_path/"structured.json", ["Summary.", "Other.", "Summary.", "Summary."])
+    amap = build_section_audio(structured, out)
+    assert calls(ffmpeg_log) == 2
+    assert len(amap) == 4
+    dupes = [out/amap[sid] for sid in ("sec_01", "sec_03", "sec_04")]
+    assert len({p.name for p in dupes}) == 3  # each section keeps its own file
+    assert len({(p.stat().st_dev, p.stat().st_ino) for p in dupes}) == 1  # hardlinked